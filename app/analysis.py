@@ -13,7 +13,7 @@ import csv
 import io
 from collections import Counter, defaultdict
 
-from .i18n import Texts, format_emotion_list, get_time_period_text, generate_insight
+from .i18n import Texts, CSV_HEADER_LINE, HOUR_STRS, format_emotion_list, get_time_period_text, generate_insight
 
 logger = logging.getLogger(__name__)
 
@@ -285,7 +285,7 @@ class WeeklyAnalyzer:
                 summary_parts.append(f"{triggers_str}\n")
         
         summary_parts.extend([
-            f"<b>⏰ Пик активности:</b> {peak_hour:02d}:00 ({peak_period})",
+            f"<b>⏰ Пик активности:</b> {HOUR_STRS[peak_hour]}:00 ({peak_period})",
             f"<b>📈 Всего записей:</b> {total_entries}",
             ""
         ])
@@ -337,11 +337,15 @@ class WeeklyAnalyzer:
         
         return "\n\n".join(insights) if insights else ""
     
-    def _parse_emotions(self, emotions_str: str) -> List[str]:
-        """Parse emotions from JSON or plain text"""
+    def _parse_emotions(self, emotions_str) -> List[str]:
+        """Parse emotions from a stored list, JSON string or plain text"""
         if not emotions_str:
             return []
-        
+
+        # JSON-колонка отдаёт уже распарсенный список
+        if isinstance(emotions_str, list):
+            return [str(e).strip() for e in emotions_str if e]
+
         try:
             # Try parsing as JSON array
             emotions = json.loads(emotions_str)
@@ -449,8 +453,8 @@ class WeeklyAnalyzer:
             output = io.StringIO()
             writer = csv.writer(output)
             
-            # Write headers
-            writer.writerow(self.texts.CSV_HEADERS)
+            # Write headers (прекомпилированная строка, без прохода через csv.writer)
+            output.write(CSV_HEADER_LINE)
             
             # Write data rows
             for entry in entries:
@@ -461,10 +465,13 @@ class WeeklyAnalyzer:
                 # Parse tags
                 tags = []
                 if entry.tags:
-                    try:
-                        tags = json.loads(entry.tags)
-                    except json.JSONDecodeError:
-                        tags = [entry.tags]
+                    if isinstance(entry.tags, list):
+                        tags = entry.tags
+                    else:
+                        try:
+                            tags = json.loads(entry.tags)
+                        except json.JSONDecodeError:
+                            tags = [entry.tags]
                 tags_str = ', '.join(tags) if tags else ''
                 
                 # Format row
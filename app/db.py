@@ -6,13 +6,17 @@ SQLite with SQLAlchemy for persistence - Enhanced with comprehensive user settin
 
 import os
 import logging
-from datetime import datetime, timezone as dt_timezone, date
+import threading
+from contextlib import contextmanager
+from collections import Counter
+from functools import lru_cache, partial
+from datetime import datetime, timezone as dt_timezone, date, timedelta
 from typing import Optional, List, Dict, Any
 import json
+import zoneinfo
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Text, Date, Index
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event, Column, ForeignKey, Integer, String, DateTime, Boolean, Text, Date, Index, JSON, bindparam, case, lambda_stmt, literal, select, text, update
+from sqlalchemy.orm import declarative_base, sessionmaker, scoped_session, Session, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
@@ -20,6 +24,47 @@ from .security import sanitize_user_input
 
 logger = logging.getLogger(__name__)
 
+# orjson (C-расширение) в разы быстрее stdlib json на разборе/сериализации
+# JSON-колонок; при его отсутствии тихо откатываемся на stdlib
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover
+    _json_dumps = partial(json.dumps, ensure_ascii=False)
+    _json_loads = json.loads
+
+# Связанный санитайзер для горячего цикла агрегации эмоций: без повторного
+# разрешения именованного аргумента на каждый токен
+_sanitize_emotion = partial(sanitize_user_input, input_type="emotion")
+
+# Пинг health_check: конструируется один раз, компиляция кэшируется
+_PING = text("SELECT 1")
+
+
+# ZoneInfo по имени: конструктор и так кэширует экземпляры, lru_cache
+# дополнительно убирает его диспатч из горячего пути create_entry
+_zoneinfo = lru_cache(maxsize=128)(zoneinfo.ZoneInfo)
+
+
+def _cause_tokens(cause: str):
+    """Токены причины: та же эвристика, что исторически в get_cause_frequencies"""
+    return (word for word in cause.lower().split() if len(word) > 3)
+
+
+def _lenient_json_loads(value):
+    """Десериализатор для JSON-колонок: старые строки (emotions/tags до
+    миграции на typed JSON) могли храниться простым текстом - возвращаем
+    их как есть вместо исключения, читающий код обрабатывает оба вида."""
+    try:
+        return _json_loads(value)
+    except (ValueError, TypeError):
+        return value
+
+
 Base = declarative_base()
 
 class User(Base):
@@ -32,39 +77,63 @@ class User(Base):
     paused = Column(Boolean, default=False, nullable=False)
     last_activity = Column(DateTime(timezone=True), default=func.now(), nullable=False)
 
+    # Отношения объявлены с lazy="raise": случайная ленивая загрузка (N+1)
+    # должна падать сразу, а не молча генерировать лишние запросы.
+    # Явная загрузка - через .options(selectinload(...)) в читающем коде.
+    settings = relationship(
+        'UserSettings',
+        primaryjoin='User.id == foreign(UserSettings.user_id)',
+        uselist=False,
+        viewonly=True,
+        lazy='raise',
+    )
+    entries = relationship(
+        'Entry',
+        primaryjoin='User.id == foreign(Entry.user_id)',
+        viewonly=True,
+        lazy='raise',
+    )
+
 class Entry(Base):
     __tablename__ = 'entries'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    # Одиночный индекс по user_id не нужен: его покрывают составные
+    # idx_entries_user_date / idx_entries_stats (левый префикс)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     ts_local = Column(DateTime, nullable=False, index=True)  # Local timezone timestamp
     valence = Column(Integer, nullable=True)  # -5 to +5 (Russell's Circumplex)
     arousal = Column(Integer, nullable=True)  # -5 to +5 (Russell's Circumplex) 
-    emotions = Column(Text, nullable=True)  # JSON array of emotion words
+    emotions = Column(JSON, nullable=True)  # JSON array of emotion words
     cause = Column(Text, nullable=True)  # What caused this emotion
     body = Column(Text, nullable=True)  # Bodily sensations
     note = Column(Text, nullable=True)  # Additional notes
-    tags = Column(Text, nullable=True)  # JSON array of tags
+    tags = Column(JSON, nullable=True)  # JSON array of tags
     created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
 
 class Schedule(Base):
     __tablename__ = 'schedules'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     date_local = Column(Date, nullable=False, index=True)  # Local date
-    times_local = Column(Text, nullable=False)  # JSON array of HH:MM strings
+    times_local = Column(JSON, nullable=False)  # JSON array of HH:MM strings
     created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
 
 class UserSettings(Base):
     __tablename__ = 'user_settings'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, unique=True, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), unique=True, nullable=False, index=True)
     
     # Weekly summary settings
     weekly_summary_enabled = Column(Boolean, default=True, nullable=False)
     summary_time_hour = Column(Integer, default=21, nullable=False)  # Hour 0-23
+
+    # Onboarding/delivery flags (promoted from advanced_settings JSON:
+    # stable keys deserve typed columns, not a parse on every read)
+    onboarding_completed = Column(Boolean, default=True, nullable=False)
+    first_summary_sent = Column(Boolean, default=False, nullable=False)
     
     # Notification preferences
     ping_frequency = Column(String(20), default='normal', nullable=False)  # 'normal', 'reduced', 'minimal'
@@ -89,7 +158,7 @@ class SummaryDelivery(Base):
     __tablename__ = 'summary_deliveries'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     delivery_date = Column(Date, nullable=False, index=True)  # Date when summary was sent
     summary_period_days = Column(Integer, default=7, nullable=False)  # Period covered (7, 14, 30, etc.)
     delivery_type = Column(String(20), default='automatic', nullable=False)  # 'automatic', 'manual'
@@ -97,11 +166,78 @@ class SummaryDelivery(Base):
     success = Column(Boolean, default=True, nullable=False)  # Whether delivery succeeded
     created_at = Column(DateTime(timezone=True), default=func.now(), nullable=False)
 
+# Материализованные частоты слов-причин: токенизация амортизируется в путь
+# записи (причины неизменяемы после создания), чтение - один SELECT вместо
+# прохода по всем entries пользователя
+class CauseTokenCount(Base):
+    __tablename__ = 'cause_token_counts'
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    token = Column(String(100), nullable=False)
+    date_bucket = Column(Date, nullable=False)  # Local date of the entry
+    count = Column(Integer, default=0, nullable=False)
+
 # Create indexes for performance
 Index('idx_entries_user_date', Entry.user_id, Entry.ts_local)
 Index('idx_schedules_user_date', Schedule.user_id, Schedule.date_local)
 Index('idx_user_settings_user_id', UserSettings.user_id)
 Index('idx_summary_deliveries_user_date', SummaryDelivery.user_id, SummaryDelivery.delivery_date)
+# Горячие предикаты статистики: активность за неделю и успешные доставки
+Index('idx_user_last_activity', User.last_activity)
+Index('idx_summary_success_created', SummaryDelivery.success, SummaryDelivery.created_at)
+# На дату у пользователя ровно одно расписание - опора для UPSERT
+Index('uq_schedules_user_date', Schedule.user_id, Schedule.date_local, unique=True)
+# Покрывающий индекс для легаси-путей статистики: колонки emotions/cause
+# читаются прямо из btree (index-only scan), без прыжков в таблицу
+Index('idx_entries_stats', Entry.user_id, Entry.ts_local.desc(),
+      Entry.emotions, Entry.cause)
+# Один счётчик на (пользователь, токен, день) - опора для инкрементного UPSERT
+Index('uq_cause_tokens_user_token_date', CauseTokenCount.user_id,
+      CauseTokenCount.token, CauseTokenCount.date_bucket, unique=True)
+
+# Горячие запросы, собранные один раз на уровне модуля: lambda_stmt
+# кэширует и построение, и компиляцию выражения, остаётся только подстановка
+# параметров. Используются из get_user / get_user_by_chat_id и т.п.
+_GET_USER_STMT = lambda_stmt(lambda: select(User).where(User.id == bindparam('uid')))
+_GET_USER_BY_CHAT_STMT = lambda_stmt(lambda: select(User).where(User.chat_id == bindparam('cid')))
+_GET_SETTINGS_STMT = lambda_stmt(lambda: select(UserSettings).where(UserSettings.user_id == bindparam('uid')))
+_GET_SCHEDULE_STMT = lambda_stmt(
+    lambda: select(Schedule)
+    .where(Schedule.user_id == bindparam('uid'))
+    .where(Schedule.date_local == bindparam('dt'))
+)
+_Q_ENTRIES_RANGE = lambda_stmt(
+    lambda: select(Entry.id, Entry.user_id, Entry.ts_local,
+                   Entry.valence, Entry.arousal, Entry.emotions,
+                   Entry.cause, Entry.body, Entry.note, Entry.tags,
+                   Entry.created_at)
+    .where(Entry.user_id == bindparam('uid'))
+    .where(Entry.ts_local >= bindparam('cut'))
+    .order_by(Entry.ts_local.desc())
+    .limit(10000)  # Safety limit
+)
+
+# Агрегаты get_global_stats одним statement: пять скалярных подзапросов
+# в одном SELECT - один round-trip и одна строка в ответе вместо четырёх
+# запросов. SQL собирается один раз на импорт, меняется только cutoff.
+_STMT_GLOBAL_STATS = select(
+    select(func.count(User.id)).scalar_subquery().label('total_users'),
+    select(
+        func.coalesce(func.sum(case((User.last_activity >= bindparam('cutoff'), 1), else_=0)), 0)
+    ).scalar_subquery().label('active_weekly'),
+    select(func.count()).select_from(Entry).scalar_subquery().label('total_entries'),
+    # (.is_(True) вместо == True - дружелюбнее к планировщику)
+    select(func.count())
+    .select_from(UserSettings)
+    .where(UserSettings.weekly_summary_enabled.is_(True))
+    .scalar_subquery().label('weekly_summary_users'),
+    select(func.count())
+    .select_from(SummaryDelivery)
+    .where(SummaryDelivery.created_at >= bindparam('cutoff'))
+    .where(SummaryDelivery.success.is_(True))
+    .scalar_subquery().label('summaries_this_week'),
+)
 
 class Database:
     """Database access layer with enhanced user settings and summary tracking"""
@@ -110,33 +246,275 @@ class Database:
         if db_url is None:
             db_url = os.getenv('DATABASE_URL', 'sqlite:///data/emojournal.db')
         
+        in_memory = db_url in ('sqlite://', 'sqlite:///:memory:')
+
         # Ensure data directory exists for SQLite
-        if db_url.startswith('sqlite:///'):
+        if db_url.startswith('sqlite:///') and not in_memory:
             db_path = db_url.replace('sqlite:///', '')
             os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
             self.db_path = db_path
         else:
             self.db_path = None
-        
+
+        engine_kwargs: Dict[str, Any] = {}
+        if in_memory:
+            # Тестовый режим: одна разделяемая connection, иначе каждая
+            # сессия получила бы собственную пустую in-memory БД
+            from sqlalchemy.pool import StaticPool
+            engine_kwargs['poolclass'] = StaticPool
+
         self.engine = create_engine(
             db_url,
             echo=False,  # Set to True for SQL debugging
-            pool_pre_ping=True,
-            connect_args={"check_same_thread": False} if db_url.startswith('sqlite') else {}
+            # Пинг на checkout нужен сетевым БД против протухших TCP-сессий;
+            # для локального SQLite это лишний запрос на каждое соединение
+            pool_pre_ping=not db_url.startswith('sqlite'),
+            query_cache_size=1200,  # кэш скомпилированного SQL по форме запроса
+            json_serializer=_json_dumps,
+            json_deserializer=_lenient_json_loads,
+            # cached_statements: кэш подготовленных запросов в самом sqlite3
+            connect_args={"check_same_thread": False, "cached_statements": 256} if db_url.startswith('sqlite') else {},
+            **engine_kwargs
         )
         
+        if db_url.startswith('sqlite'):
+            # Много мелких коммитов (записи, расписания, доставки) - WAL с
+            # synchronous=NORMAL снимает fsync с каждого коммита, остальные
+            # PRAGMA уменьшают дисковый I/O на чтениях
+            @event.listens_for(self.engine, "connect")
+            def _tune_sqlite_on_connect(dbapi_conn, connection_record):
+                cursor = dbapi_conn.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                cursor.execute("PRAGMA cache_size=-64000")  # ~64 МБ page cache
+                cursor.execute("PRAGMA mmap_size=268435456")  # 256 МБ mmap
+                cursor.execute("PRAGMA foreign_keys=ON")
+                cursor.close()
+
+            # PRAGMA optimize при возврате соединения: поддерживает статистику
+            # планировщика (sqlite_stat1) актуальной по мере роста entries
+            @event.listens_for(self.engine, "close")
+            def _optimize_on_close(dbapi_conn, connection_record):
+                try:
+                    dbapi_conn.execute("PRAGMA optimize")
+                except Exception:
+                    pass  # соединение уже может быть закрыто
+
         # Create tables
         Base.metadata.create_all(self.engine)
-        
-        # Create session factory
-        self.SessionLocal = sessionmaker(bind=self.engine)
-        
+        self._ensure_sqlite_columns()
+
+        # create_all пропускает индексы уже существующих таблиц -
+        # новые индексы доезжают на старые БД через checkfirst
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                try:
+                    index.create(bind=self.engine, checkfirst=True)
+                except SQLAlchemyError as e:
+                    logger.error(f"Failed to ensure index {index.name}: {e}")
+
+        if db_url.startswith('sqlite'):
+            # Первичная статистика для планировщика на свежей БД
+            with self.engine.connect() as conn:
+                conn.execute(text("ANALYZE"))
+                conn.commit()
+
+        # Create session factory: scoped_session переиспользует thread-local
+        # сессию между шагами одного тика (меньше checkout'ов соединений),
+        # expire_on_commit=False не сбрасывает атрибуты после commit -
+        # возвращённые объекты не делают re-SELECT при обращении к полям
+        self.SessionLocal = scoped_session(
+            sessionmaker(bind=self.engine, expire_on_commit=False)
+        )
+
+        # Debounced last_activity updates: create_entry only records the
+        # timestamp here; flush_pending_activity() writes them in one batch
+        self._pending_activity: Dict[int, datetime] = {}
+        self._activity_lock = threading.Lock()
+
+        # TTL-кэш для get_global_stats: (monotonic-срок годности, значение)
+        self._global_stats_cache: Optional[tuple] = None
+        self._stats_cache_lock = threading.Lock()
+
+        # Таймзоны пользователей: меняются редко, но читаются на каждую
+        # запись - держим в процессе, инвалидация в update_user_timezone
+        self._tz_cache: Dict[int, str] = {}
+
+        # Монотонное время последнего успешного health_check
+        self._last_health_ok = float('-inf')
+
+        # Догоняем материализованные счётчики причин для записей,
+        # созданных до появления cause_token_counts
+        self._backfill_cause_tokens()
+
         logger.info(f"Database initialized: {db_url}")
     
     def get_session(self) -> Session:
-        """Get database session"""
+        """Get database session (thread-local, см. scoped_session)"""
         return self.SessionLocal()
-    
+
+    @contextmanager
+    def session_scope(self):
+        """Транзакционная область для многошаговых операций.
+
+        Позволяет вызывающему коду выполнить несколько действий в одной
+        сессии/транзакции с commit в конце и rollback при исключении.
+        """
+        session = self.SessionLocal()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def _read_connection(self):
+        """Core-соединение для чисто читающих запросов.
+
+        AUTOCOMMIT снимает неявные BEGIN/COMMIT, которые SQLAlchemy
+        оборачивает вокруг каждого SELECT, - на горячих статистиках это
+        два лишних round-trip'а на вызов.
+        """
+        return self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+
+    def get_user_fields(self, user_id: int, *cols) -> Optional[Any]:
+        """Точечное чтение колонок users как Row, без ORM-гидрации.
+
+        Пример: db.get_user_fields(uid, User.chat_id, User.paused).
+        Для вызывающих, которым нужна пара полей, а не весь объект User
+        с identity map и инструментированными атрибутами.
+        """
+        if not cols:
+            raise ValueError("No columns requested")
+
+        try:
+            with self._read_connection() as conn:
+                return conn.execute(
+                    select(*cols).where(User.id == user_id)
+                ).one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting fields for user {user_id}: {e}")
+            return None
+
+    def _get_user_timezone(self, user_id: int) -> Optional[str]:
+        """Таймзона пользователя через in-process кэш.
+
+        None означает, что пользователя нет. Колонка читается точечно,
+        без гидрации всей строки User.
+        """
+        tz_name = self._tz_cache.get(user_id)
+        if tz_name is not None:
+            return tz_name
+
+        try:
+            with self._read_connection() as conn:
+                tz_name = conn.execute(
+                    select(User.timezone).where(User.id == user_id)
+                ).scalar_one_or_none()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting timezone for user {user_id}: {e}")
+            return None
+
+        if tz_name is not None:
+            self._tz_cache[user_id] = tz_name
+        return tz_name
+
+    def _ensure_sqlite_columns(self):
+        """Лёгкая миграция для SQLite: добавляет недостающие колонки.
+
+        create_all не трогает уже существующие таблицы, поэтому новые
+        колонки моделей доезжают через ALTER TABLE ADD COLUMN. Полноценный
+        Alembic для однофайловой SQLite здесь избыточен.
+        """
+        if not self.engine.url.drivername.startswith('sqlite'):
+            return
+        try:
+            with self.engine.connect() as conn:
+                for table in Base.metadata.sorted_tables:
+                    existing = {
+                        row[1] for row in
+                        conn.execute(text(f'PRAGMA table_info("{table.name}")'))
+                    }
+                    for column in table.columns:
+                        if column.name in existing:
+                            continue
+                        ddl = (f'ALTER TABLE "{table.name}" ADD COLUMN '
+                               f'{column.name} {column.type.compile(self.engine.dialect)}')
+                        default = column.default
+                        if default is not None and getattr(default, 'is_scalar', False):
+                            value = default.arg
+                            if isinstance(value, bool):
+                                value = int(value)
+                            if isinstance(value, (int, float)):
+                                ddl += f' DEFAULT {value}'
+                            else:
+                                ddl += f" DEFAULT '{value}'"
+                            if not column.nullable:
+                                ddl += ' NOT NULL'
+                        conn.execute(text(ddl))
+                        logger.info(f"Added column {table.name}.{column.name}")
+                conn.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error ensuring columns: {e}")
+
+    def _touch_activity(self, user_id: int, when: Optional[datetime] = None):
+        """Record last_activity for a user without issuing an UPDATE.
+
+        The write is deferred to flush_pending_activity() so the hottest
+        path (create_entry) does a single INSERT instead of INSERT+UPDATE.
+        """
+        with self._activity_lock:
+            self._pending_activity[user_id] = when or datetime.now(dt_timezone.utc)
+
+    def flush_pending_activity(self):
+        """Flush debounced last_activity timestamps in a single batch.
+
+        Called periodically (the scheduler runs this every minute);
+        last_activity is only used for housekeeping stats, so a short
+        delay is acceptable.
+        """
+        with self._activity_lock:
+            if not self._pending_activity:
+                return
+            pending = self._pending_activity
+            self._pending_activity = {}
+
+        try:
+            with self.get_session() as session:
+                # Core-уровень: executemany одним UPDATE, минуя ORM unit of work
+                session.connection().execute(
+                    update(User)
+                    .where(User.id == bindparam('b_user_id'))
+                    .values(last_activity=bindparam('b_last_activity')),
+                    [{'b_user_id': uid, 'b_last_activity': ts} for uid, ts in pending.items()]
+                )
+                session.commit()
+                logger.debug(f"Flushed last_activity for {len(pending)} users")
+        except SQLAlchemyError as e:
+            logger.error(f"Database error flushing activity updates: {e}")
+            # Re-queue so the timestamps are not lost (newer entries win)
+            with self._activity_lock:
+                for uid, ts in pending.items():
+                    self._pending_activity.setdefault(uid, ts)
+
+    def run_pragma_optimize(self):
+        """Refresh SQLite planner statistics (no-op for other backends).
+
+        Запускается планировщиком раз в сутки, чтобы sqlite_stat1 не
+        устаревала по мере роста entries.
+        """
+        if not self.engine.url.drivername.startswith('sqlite'):
+            return
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("PRAGMA optimize"))
+                conn.commit()
+            logger.debug("PRAGMA optimize completed")
+        except SQLAlchemyError as e:
+            logger.error(f"Database error running PRAGMA optimize: {e}")
+
+
     def create_user(self, user_id: int, chat_id: int, user_timezone: str = 'Europe/Moscow') -> User:
         """Create new user with validation and comprehensive default settings"""
         # Validate inputs
@@ -152,42 +530,61 @@ class Database:
         
         # Validate timezone format
         try:
-            import zoneinfo
-            zoneinfo.ZoneInfo(timezone_validated)
+            _zoneinfo(timezone_validated)
         except Exception:
             timezone_validated = 'Europe/Moscow'
         
         try:
             with self.get_session() as session:
-                # Check if user already exists
-                existing_user = session.query(User).filter(User.id == user_id).first()
-                if existing_user:
+                now_utc = datetime.now(dt_timezone.utc)
+
+                if self.engine.url.drivername.startswith('sqlite'):
+                    # Атомарный INSERT ... ON CONFLICT DO NOTHING вместо
+                    # SELECT-потом-INSERT: нет гонки между двумя /start
+                    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+                    result = session.execute(
+                        sqlite_insert(User).values(
+                            id=user_id,
+                            chat_id=chat_id,
+                            timezone=timezone_validated,
+                            created_at=now_utc,
+                            last_activity=now_utc
+                        ).on_conflict_do_nothing(index_elements=['id'])
+                    )
+                    session.commit()
+                    created = result.rowcount > 0
+                else:
+                    created = False
+                    existing_user = session.execute(_GET_USER_STMT, {'uid': user_id}).scalar_one_or_none()
+                    if not existing_user:
+                        session.add(User(
+                            id=user_id,
+                            chat_id=chat_id,
+                            timezone=timezone_validated,
+                            created_at=now_utc,
+                            last_activity=now_utc
+                        ))
+                        session.commit()
+                        created = True
+
+                if not created:
                     logger.warning(f"User {user_id} already exists")
-                    return existing_user
-                
-                user = User(
-                    id=user_id,
-                    chat_id=chat_id,
-                    timezone=timezone_validated,
-                    created_at=datetime.now(dt_timezone.utc),
-                    last_activity=datetime.now(dt_timezone.utc)
-                )
-                
-                session.add(user)
-                session.commit()
-                session.refresh(user)
-                
+                    return session.execute(_GET_USER_STMT, {'uid': user_id}).scalar_one_or_none()
+
+                self._tz_cache[user_id] = timezone_validated
+
                 # Create comprehensive default user settings
                 self._create_default_user_settings(user_id)
-                
+
+                self._invalidate_global_stats()
                 logger.info(f"Created user {user_id} with chat_id {chat_id}")
-                return user
-                
+                return session.execute(_GET_USER_STMT, {'uid': user_id}).scalar_one_or_none()
+
         except IntegrityError as e:
             logger.error(f"Integrity error creating user {user_id}: {e}")
             # Try to get existing user
             with self.get_session() as session:
-                return session.query(User).filter(User.id == user_id).first()
+                return session.execute(_GET_USER_STMT, {'uid': user_id}).scalar_one_or_none()
         except SQLAlchemyError as e:
             logger.error(f"Database error creating user {user_id}: {e}")
             raise
@@ -197,14 +594,13 @@ class Database:
         try:
             with self.get_session() as session:
                 # Check if settings already exist
-                existing_settings = session.query(UserSettings).filter(UserSettings.user_id == user_id).first()
+                existing_settings = session.execute(_GET_SETTINGS_STMT, {'uid': user_id}).scalar_one_or_none()
                 if existing_settings:
                     return
                 
-                # Create default advanced settings
+                # Create default advanced settings (open-ended extras only;
+                # onboarding/delivery flags live in typed columns)
                 advanced_settings = {
-                    'onboarding_completed': True,
-                    'first_summary_sent': False,
                     'preferred_insight_types': ['patterns', 'triggers', 'time_based'],
                     'custom_emotion_categories': [],
                     'export_preferences': {
@@ -212,19 +608,22 @@ class Database:
                         'date_format': 'YYYY-MM-DD'
                     }
                 }
-                
+
+                now_utc = datetime.now(dt_timezone.utc)
                 settings = UserSettings(
                     user_id=user_id,
                     weekly_summary_enabled=True,
                     summary_time_hour=21,
+                    onboarding_completed=True,
+                    first_summary_sent=False,
                     ping_frequency='normal',
                     weekend_pings=True,
                     data_retention_days=365,
                     preferred_language='ru',
                     emoji_style='default',
-                    advanced_settings=json.dumps(advanced_settings, ensure_ascii=False),
-                    created_at=datetime.now(dt_timezone.utc),
-                    updated_at=datetime.now(dt_timezone.utc)
+                    advanced_settings=_json_dumps(advanced_settings),
+                    created_at=now_utc,
+                    updated_at=now_utc
                 )
                 
                 session.add(settings)
@@ -239,16 +638,16 @@ class Database:
         """Get user by ID with error handling"""
         try:
             with self.get_session() as session:
-                return session.query(User).filter(User.id == user_id).first()
+                return session.execute(_GET_USER_STMT, {'uid': user_id}).scalar_one_or_none()
         except SQLAlchemyError as e:
             logger.error(f"Database error getting user {user_id}: {e}")
             return None
-    
+
     def get_user_by_chat_id(self, chat_id: int) -> Optional[User]:
         """Get user by chat ID with error handling"""
         try:
             with self.get_session() as session:
-                return session.query(User).filter(User.chat_id == chat_id).first()
+                return session.execute(_GET_USER_BY_CHAT_STMT, {'cid': chat_id}).scalar_one_or_none()
         except SQLAlchemyError as e:
             logger.error(f"Database error getting user by chat_id {chat_id}: {e}")
             return None
@@ -257,17 +656,19 @@ class Database:
         """Get user settings as comprehensive dictionary"""
         try:
             with self.get_session() as session:
-                settings = session.query(UserSettings).filter(UserSettings.user_id == user_id).first()
+                settings = session.execute(_GET_SETTINGS_STMT, {'uid': user_id}).scalar_one_or_none()
                 if not settings:
                     # Create default settings if they don't exist
                     self._create_default_user_settings(user_id)
-                    settings = session.query(UserSettings).filter(UserSettings.user_id == user_id).first()
+                    settings = session.execute(_GET_SETTINGS_STMT, {'uid': user_id}).scalar_one_or_none()
                 
                 if settings:
                     result = {
                         # Core settings
                         'weekly_summary_enabled': settings.weekly_summary_enabled,
                         'summary_time_hour': settings.summary_time_hour,
+                        'onboarding_completed': settings.onboarding_completed,
+                        'first_summary_sent': settings.first_summary_sent,
                         'ping_frequency': settings.ping_frequency,
                         'weekend_pings': settings.weekend_pings,
                         'data_retention_days': settings.data_retention_days,
@@ -282,9 +683,14 @@ class Database:
                     # Add advanced settings from JSON
                     if settings.advanced_settings:
                         try:
-                            advanced = json.loads(settings.advanced_settings)
+                            advanced = _json_loads(settings.advanced_settings)
+                            # Старые строки хранили флаги в JSON - поднимаем
+                            # их в типизированные ключи при чтении
+                            for legacy_key in ('onboarding_completed', 'first_summary_sent'):
+                                if legacy_key in advanced:
+                                    result[legacy_key] = bool(advanced.pop(legacy_key))
                             result['advanced'] = advanced
-                        except json.JSONDecodeError:
+                        except ValueError:
                             logger.warning(f"Invalid advanced settings JSON for user {user_id}")
                             result['advanced'] = {}
                     else:
@@ -298,75 +704,123 @@ class Database:
             logger.error(f"Database error getting settings for user {user_id}: {e}")
             return None
     
+    # Ключи, живущие в типизированных колонках user_settings
+    _TYPED_SETTINGS_KEYS = frozenset({
+        'weekly_summary_enabled', 'summary_time_hour', 'ping_frequency',
+        'weekend_pings', 'data_retention_days', 'preferred_language',
+        'emoji_style', 'onboarding_completed', 'first_summary_sent',
+    })
+
+    @classmethod
+    def _validate_settings_kwargs(cls, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate typed settings kwargs into a values() dict for UPDATE"""
+        values: Dict[str, Any] = {}
+
+        if 'weekly_summary_enabled' in kwargs:
+            values['weekly_summary_enabled'] = bool(kwargs['weekly_summary_enabled'])
+
+        if 'summary_time_hour' in kwargs:
+            hour = int(kwargs['summary_time_hour'])
+            if 0 <= hour <= 23:
+                values['summary_time_hour'] = hour
+
+        if 'ping_frequency' in kwargs:
+            frequency = kwargs['ping_frequency']
+            if frequency in ['normal', 'reduced', 'minimal']:
+                values['ping_frequency'] = frequency
+
+        if 'weekend_pings' in kwargs:
+            values['weekend_pings'] = bool(kwargs['weekend_pings'])
+
+        if 'onboarding_completed' in kwargs:
+            values['onboarding_completed'] = bool(kwargs['onboarding_completed'])
+
+        if 'first_summary_sent' in kwargs:
+            values['first_summary_sent'] = bool(kwargs['first_summary_sent'])
+
+        if 'data_retention_days' in kwargs:
+            days = int(kwargs['data_retention_days'])
+            if 30 <= days <= 3650:  # 1 month to 10 years
+                values['data_retention_days'] = days
+
+        if 'preferred_language' in kwargs:
+            lang = kwargs['preferred_language']
+            if lang in ['ru', 'en']:  # Support for future languages
+                values['preferred_language'] = lang
+
+        if 'emoji_style' in kwargs:
+            style = kwargs['emoji_style']
+            if style in ['default', 'minimal', 'colorful']:
+                values['emoji_style'] = style
+
+        return values
+
     def update_user_settings(self, user_id: int, **kwargs):
         """Update user settings with comprehensive options"""
+        values = self._validate_settings_kwargs(kwargs)
+        extra_items = {k: v for k, v in kwargs.items()
+                       if k.startswith('advanced_') or k not in self._TYPED_SETTINGS_KEYS}
+
         try:
             with self.get_session() as session:
-                settings = session.query(UserSettings).filter(UserSettings.user_id == user_id).first()
-                
+                if not extra_items:
+                    # Быстрый путь для простых переключателей: один UPDATE
+                    # без предварительного SELECT и dirty-check
+                    values['updated_at'] = datetime.now(dt_timezone.utc)
+                    result = session.execute(
+                        update(UserSettings)
+                        .where(UserSettings.user_id == user_id)
+                        .values(**values),
+                        execution_options={"synchronize_session": False}
+                    )
+                    if result.rowcount == 0:
+                        # Строки настроек ещё нет - создаём и повторяем
+                        session.rollback()
+                        self._create_default_user_settings(user_id)
+                        session.execute(
+                            update(UserSettings)
+                            .where(UserSettings.user_id == user_id)
+                            .values(**values),
+                            execution_options={"synchronize_session": False}
+                        )
+                    session.commit()
+                    logger.info(f"Updated settings for user {user_id}")
+                    return
+
+                # JSON-merge путь: нужен SELECT, чтобы слить advanced_settings
+                settings = session.execute(_GET_SETTINGS_STMT, {'uid': user_id}).scalar_one_or_none()
+
                 if not settings:
                     # Create default settings first
                     self._create_default_user_settings(user_id)
-                    settings = session.query(UserSettings).filter(UserSettings.user_id == user_id).first()
-                
+                    settings = session.execute(_GET_SETTINGS_STMT, {'uid': user_id}).scalar_one_or_none()
+
                 if settings:
-                    # Update core settings
-                    if 'weekly_summary_enabled' in kwargs:
-                        settings.weekly_summary_enabled = bool(kwargs['weekly_summary_enabled'])
-                    
-                    if 'summary_time_hour' in kwargs:
-                        hour = int(kwargs['summary_time_hour'])
-                        if 0 <= hour <= 23:
-                            settings.summary_time_hour = hour
-                    
-                    if 'ping_frequency' in kwargs:
-                        frequency = kwargs['ping_frequency']
-                        if frequency in ['normal', 'reduced', 'minimal']:
-                            settings.ping_frequency = frequency
-                    
-                    if 'weekend_pings' in kwargs:
-                        settings.weekend_pings = bool(kwargs['weekend_pings'])
-                    
-                    if 'data_retention_days' in kwargs:
-                        days = int(kwargs['data_retention_days'])
-                        if 30 <= days <= 3650:  # 1 month to 10 years
-                            settings.data_retention_days = days
-                    
-                    if 'preferred_language' in kwargs:
-                        lang = kwargs['preferred_language']
-                        if lang in ['ru', 'en']:  # Support for future languages
-                            settings.preferred_language = lang
-                    
-                    if 'emoji_style' in kwargs:
-                        style = kwargs['emoji_style']
-                        if style in ['default', 'minimal', 'colorful']:
-                            settings.emoji_style = style
-                    
-                    # Update advanced settings
+                    for column_name, value in values.items():
+                        setattr(settings, column_name, value)
+
                     advanced_settings = {}
                     if settings.advanced_settings:
                         try:
-                            advanced_settings = json.loads(settings.advanced_settings)
-                        except json.JSONDecodeError:
+                            advanced_settings = _json_loads(settings.advanced_settings)
+                        except ValueError:
                             advanced_settings = {}
-                    
-                    # Handle advanced settings updates
-                    for key, value in kwargs.items():
+
+                    for key, value in extra_items.items():
                         if key.startswith('advanced_'):
                             setting_key = key.replace('advanced_', '')
                             advanced_settings[setting_key] = value
-                        elif key not in ['weekly_summary_enabled', 'summary_time_hour', 'ping_frequency', 
-                                       'weekend_pings', 'data_retention_days', 'preferred_language', 'emoji_style']:
+                        else:
                             # Store other custom settings in advanced
                             advanced_settings[key] = value
-                    
-                    settings.advanced_settings = json.dumps(advanced_settings, ensure_ascii=False)
+
+                    settings.advanced_settings = _json_dumps(advanced_settings)
                     settings.updated_at = datetime.now(dt_timezone.utc)
-                    
+
                     session.commit()
-                    
+
                     logger.info(f"Updated settings for user {user_id}")
-                
+
         except SQLAlchemyError as e:
             logger.error(f"Database error updating settings for user {user_id}: {e}")
             raise
@@ -379,18 +833,23 @@ class Database:
             raise ValueError("Invalid timezone")
         
         try:
-            import zoneinfo
-            zoneinfo.ZoneInfo(timezone_validated)  # Validate timezone
+            _zoneinfo(timezone_validated)  # Validate timezone
         except Exception:
             raise ValueError("Invalid timezone format")
         
         try:
             with self.get_session() as session:
-                user = session.query(User).filter(User.id == user_id).first()
-                if user:
-                    user.timezone = timezone_validated
-                    user.last_activity = datetime.now(dt_timezone.utc)
-                    session.commit()
+                # Один UPDATE с проверкой rowcount вместо SELECT-потом-UPDATE
+                result = session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(timezone=timezone_validated,
+                            last_activity=datetime.now(dt_timezone.utc)),
+                    execution_options={"synchronize_session": False}
+                )
+                session.commit()
+                if result.rowcount > 0:
+                    self._tz_cache[user_id] = timezone_validated
                     logger.info(f"Updated timezone for user {user_id} to {timezone_validated}")
                 else:
                     logger.warning(f"User {user_id} not found for timezone update")
@@ -405,11 +864,16 @@ class Database:
         
         try:
             with self.get_session() as session:
-                user = session.query(User).filter(User.id == user_id).first()
-                if user:
-                    user.paused = paused
-                    user.last_activity = datetime.now(dt_timezone.utc)
-                    session.commit()
+                # Один UPDATE с проверкой rowcount вместо SELECT-потом-UPDATE
+                result = session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(paused=paused,
+                            last_activity=datetime.now(dt_timezone.utc)),
+                    execution_options={"synchronize_session": False}
+                )
+                session.commit()
+                if result.rowcount > 0:
                     logger.info(f"Updated paused status for user {user_id} to {paused}")
                 else:
                     logger.warning(f"User {user_id} not found for paused update")
@@ -417,51 +881,103 @@ class Database:
             logger.error(f"Database error updating paused status for user {user_id}: {e}")
             raise
     
-    def get_active_users(self) -> List[User]:
-        """Get all active (non-paused) users with error handling"""
+    def get_active_users(self) -> List[Any]:
+        """Get all active (non-paused) users as lightweight Row tuples
+
+        Чтение без ORM: Core execute() не строит identity map и не
+        отслеживает атрибуты, что заметно дешевле на больших выборках.
+        Row поддерживает доступ по атрибутам (.id, .chat_id, ...),
+        поэтому вызывающий код не меняется.
+        """
+        return list(self.iter_active_users())
+
+    def iter_active_users(self):
+        """Stream active users without buffering the whole list.
+
+        Генератор держит соединение открытым только на время обхода;
+        память не зависит от числа пользователей. Планировщик, которому
+        нужен один проход, может итерироваться напрямую.
+        """
         try:
-            with self.get_session() as session:
-                return session.query(User).filter(User.paused == False).all()
+            with self._read_connection() as conn:
+                result = conn.execution_options(stream_results=True, yield_per=500).execute(
+                    select(User.id, User.chat_id, User.timezone, User.paused)
+                    .where(User.paused == False)
+                )
+                yield from result
         except SQLAlchemyError as e:
             logger.error(f"Database error getting active users: {e}")
-            return []
-    
-    def get_users_for_weekly_summary(self) -> List[User]:
-        """Get users who have weekly summaries enabled"""
+
+    def get_users_for_weekly_summary(self) -> List[Any]:
+        """Get users who have weekly summaries enabled (Row tuples)"""
         try:
-            with self.get_session() as session:
+            with self._read_connection() as conn:
                 # Join users with settings to get only those with weekly summaries enabled
-                users = (session.query(User)
-                        .join(UserSettings, User.id == UserSettings.user_id)
-                        .filter(User.paused == False)
-                        .filter(UserSettings.weekly_summary_enabled == True)
-                        .all())
-                return users
+                return conn.execute(
+                    select(User.id, User.chat_id, User.timezone, User.paused)
+                    .join(UserSettings, User.id == UserSettings.user_id)
+                    .where(User.paused == False)
+                    .where(UserSettings.weekly_summary_enabled == True)
+                ).all()
         except SQLAlchemyError as e:
             logger.error(f"Database error getting users for weekly summary: {e}")
             return []
     
     def delete_user_data(self, user_id: int):
         """Delete all data for a user with transaction safety"""
+        # Drop any debounced activity update for this user
+        with self._activity_lock:
+            self._pending_activity.pop(user_id, None)
+        self._tz_cache.pop(user_id, None)
+
         try:
+            from sqlalchemy import delete
             with self.get_session() as session:
-                # Use transaction to ensure atomicity
+                # Use transaction to ensure atomicity. Core-DELETE без
+                # synchronize_session: сессия сейчас закроется, синхронизация
+                # identity map - лишние SELECT и работа впустую.
+                # На новых БД дочерние строки снёс бы и ON DELETE CASCADE,
+                # но базы, созданные до появления FK, каскада не имеют -
+                # явные DELETE остаются (и дают счётчики для лога)
                 with session.begin():
+                    opts = {"synchronize_session": False}
+
                     # Delete entries
-                    entries_deleted = session.query(Entry).filter(Entry.user_id == user_id).delete()
-                    
+                    entries_deleted = session.execute(
+                        delete(Entry).where(Entry.user_id == user_id),
+                        execution_options=opts
+                    ).rowcount
+
                     # Delete schedules
-                    schedules_deleted = session.query(Schedule).filter(Schedule.user_id == user_id).delete()
-                    
+                    schedules_deleted = session.execute(
+                        delete(Schedule).where(Schedule.user_id == user_id),
+                        execution_options=opts
+                    ).rowcount
+
                     # Delete summary deliveries
-                    summaries_deleted = session.query(SummaryDelivery).filter(SummaryDelivery.user_id == user_id).delete()
-                    
+                    summaries_deleted = session.execute(
+                        delete(SummaryDelivery).where(SummaryDelivery.user_id == user_id),
+                        execution_options=opts
+                    ).rowcount
+
+                    # Delete materialized cause token counts
+                    session.execute(
+                        delete(CauseTokenCount).where(CauseTokenCount.user_id == user_id),
+                        execution_options=opts
+                    )
+
                     # Delete user settings
-                    settings_deleted = session.query(UserSettings).filter(UserSettings.user_id == user_id).delete()
-                    
+                    settings_deleted = session.execute(
+                        delete(UserSettings).where(UserSettings.user_id == user_id),
+                        execution_options=opts
+                    ).rowcount
+
                     # Delete user
-                    user_deleted = session.query(User).filter(User.id == user_id).delete()
-                    
+                    user_deleted = session.execute(
+                        delete(User).where(User.id == user_id),
+                        execution_options=opts
+                    ).rowcount
+
                     logger.info(f"Deleted user {user_id}: {entries_deleted} entries, "
                               f"{schedules_deleted} schedules, {summaries_deleted} summaries, "
                               f"{settings_deleted} settings, {user_deleted} user record")
@@ -470,114 +986,345 @@ class Database:
             logger.error(f"Database error deleting user data for {user_id}: {e}")
             raise
     
-    def create_entry(self, user_id: int, emotions: str = None, cause: str = None, 
-                    note: str = None, valence: int = None, arousal: int = None,
-                    body: str = None, tags: str = None) -> Entry:
-        """Create new emotion entry with comprehensive validation"""
-        
-        # Input validation
+    @staticmethod
+    def _validate_json_list(value, input_type: str) -> Optional[List[str]]:
+        """Нормализовать emotions/tags к списку строк для JSON-колонки.
+
+        Принимает список либо JSON-строку (исторический интерфейс
+        create_entry); строку без валидного JSON трактует как одно значение.
+        Каждый элемент прогоняется через санитайзер отдельно - прогон всей
+        JSON-строки срезал бы скобки и кавычки.
+        """
+        if not value:
+            return None
+
+        if isinstance(value, str):
+            try:
+                value = _json_loads(value)
+            except (ValueError, TypeError):
+                value = [value]
+
+        if not isinstance(value, list):
+            value = [value]
+
+        cleaned = []
+        for item in value[:50]:
+            item_clean = sanitize_user_input(str(item), input_type)
+            if item_clean:
+                cleaned.append(item_clean)
+
+        return cleaned or None
+
+    def _upsert_cause_tokens(self, session: Session, user_id: int,
+                             cause: str, date_bucket: date):
+        """Инкрементально обновить материализованные счётчики слов-причин.
+
+        Вызывается из create_entry в той же транзакции, что и вставка
+        записи - счётчики не могут разойтись с entries.
+        """
+        tokens = Counter(_cause_tokens(cause))
+        if not tokens:
+            return
+
+        if self.engine.url.drivername.startswith('sqlite'):
+            from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+            stmt = sqlite_insert(CauseTokenCount)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'token', 'date_bucket'],
+                set_=dict(count=CauseTokenCount.count + stmt.excluded.count)
+            )
+            session.execute(stmt, [
+                {'user_id': user_id, 'token': token,
+                 'date_bucket': date_bucket, 'count': cnt}
+                for token, cnt in tokens.items()
+            ])
+            return
+
+        # Общий путь: UPDATE, при rowcount == 0 - INSERT (токенов на
+        # причину единицы, round-trip'ы не критичны)
+        for token, cnt in tokens.items():
+            result = session.execute(
+                update(CauseTokenCount)
+                .where(CauseTokenCount.user_id == user_id)
+                .where(CauseTokenCount.token == token)
+                .where(CauseTokenCount.date_bucket == date_bucket)
+                .values(count=CauseTokenCount.count + cnt)
+            )
+            if result.rowcount == 0:
+                session.add(CauseTokenCount(
+                    user_id=user_id, token=token,
+                    date_bucket=date_bucket, count=cnt
+                ))
+
+    def _backfill_cause_tokens(self):
+        """Догнать материализованные счётчики причин для старых записей.
+
+        Записи, созданные до появления cause_token_counts, в счётчики не
+        попали, а свежие бакеты их не заменяют - суммы получались
+        неполными, как только у пользователя появлялась хотя бы одна
+        новая запись. Пользователям, у которых самая ранняя запись с
+        причиной старше их самого раннего бакета, счётчики
+        перестраиваются из entries на всю глубину статистики; у
+        пользователей с ровно одним пограничным днём пересчитывается
+        только он. После ремонта расхождений не остаётся, поэтому
+        повторные старты ничего не делают.
+        """
+        horizon = datetime.now() - timedelta(days=self._CAUSE_TOKEN_RETENTION_DAYS)
+
+        try:
+            from sqlalchemy import delete, insert
+            with self.get_session() as session:
+                first_buckets = dict(session.execute(
+                    select(CauseTokenCount.user_id,
+                           func.min(CauseTokenCount.date_bucket))
+                    .group_by(CauseTokenCount.user_id)
+                ).all())
+
+                rebuild_users = []
+                boundary_users = []
+                for uid, first_ts in session.execute(
+                    select(Entry.user_id, func.min(Entry.ts_local))
+                    .where(Entry.cause.isnot(None))
+                    .where(Entry.ts_local >= horizon)
+                    .group_by(Entry.user_id)
+                ):
+                    first_bucket = first_buckets.get(uid)
+                    if first_bucket is None or first_ts.date() < first_bucket:
+                        rebuild_users.append(uid)
+                    elif first_ts.date() == first_bucket:
+                        # Записи дня деплоя могли попасть в бакеты лишь
+                        # частично - день проверяется отдельно
+                        boundary_users.append((uid, first_bucket))
+
+                for uid in rebuild_users:
+                    per_day: Dict[date, Counter] = {}
+                    for cause, ts_local in session.execute(
+                        select(Entry.cause, Entry.ts_local)
+                        .where(Entry.user_id == uid)
+                        .where(Entry.cause.isnot(None))
+                        .where(Entry.ts_local >= horizon)
+                    ):
+                        per_day.setdefault(ts_local.date(), Counter()).update(
+                            _cause_tokens(cause))
+
+                    session.execute(
+                        delete(CauseTokenCount)
+                        .where(CauseTokenCount.user_id == uid)
+                    )
+                    rows = [
+                        {'user_id': uid, 'token': token,
+                         'date_bucket': day, 'count': cnt}
+                        for day, tokens in per_day.items()
+                        for token, cnt in tokens.items()
+                    ]
+                    if rows:
+                        session.execute(insert(CauseTokenCount), rows)
+
+                repaired = 0
+                for uid, day in boundary_users:
+                    day_start = datetime.combine(day, datetime.min.time())
+                    tokens: Counter = Counter()
+                    for (cause,) in session.execute(
+                        select(Entry.cause)
+                        .where(Entry.user_id == uid)
+                        .where(Entry.cause.isnot(None))
+                        .where(Entry.ts_local >= day_start)
+                        .where(Entry.ts_local < day_start + timedelta(days=1))
+                    ):
+                        tokens.update(_cause_tokens(cause))
+
+                    stored = Counter({
+                        token: int(cnt) for token, cnt in session.execute(
+                            select(CauseTokenCount.token, CauseTokenCount.count)
+                            .where(CauseTokenCount.user_id == uid)
+                            .where(CauseTokenCount.date_bucket == day)
+                        )
+                    })
+                    if tokens == stored:
+                        continue
+
+                    session.execute(
+                        delete(CauseTokenCount)
+                        .where(CauseTokenCount.user_id == uid)
+                        .where(CauseTokenCount.date_bucket == day)
+                    )
+                    if tokens:
+                        session.execute(insert(CauseTokenCount), [
+                            {'user_id': uid, 'token': token,
+                             'date_bucket': day, 'count': cnt}
+                            for token, cnt in tokens.items()
+                        ])
+                    repaired += 1
+
+                if rebuild_users or repaired:
+                    session.commit()
+                    logger.info(
+                        f"Backfilled cause token counts: "
+                        f"{len(rebuild_users)} rebuilt, {repaired} repaired")
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to backfill cause token counts: {e}")
+
+    def _prepare_entry_row(self, user_id: int, emotions=None, cause: str = None,
+                           note: str = None, valence: int = None, arousal: int = None,
+                           body: str = None, tags=None) -> Dict[str, Any]:
+        """Провалидировать поля записи и собрать dict для INSERT.
+
+        Вся санитизация - regex-тяжёлая CPU-работа - выполняется здесь,
+        до открытия сессии, чтобы не держать соединение (а под SQLite и
+        write lock) во время валидации.
+        """
         if not isinstance(user_id, int) or user_id <= 0:
             raise ValueError("Invalid user_id")
-        
-        # Validate and sanitize text inputs
-        emotions_validated = None
-        if emotions:
-            emotions_validated = sanitize_user_input(emotions, "general")
-            if emotions_validated and len(emotions_validated) > 2000:
-                emotions_validated = emotions_validated[:2000]
-        
+
+        # emotions/tags приходят JSON-строкой или списком; разбираем один раз
+        # на записи и сохраняем готовый список в JSON-колонку - читающие пути
+        # (анализ, частоты) больше не парсят строку на каждое чтение
+        emotions_validated = self._validate_json_list(emotions, "emotion")
+
         cause_validated = None
         if cause:
             cause_validated = sanitize_user_input(cause, "cause")
             if cause_validated and len(cause_validated) > 2000:
                 cause_validated = cause_validated[:2000]
-        
+
         note_validated = None
         if note:
             note_validated = sanitize_user_input(note, "note")
             if note_validated and len(note_validated) > 2000:
                 note_validated = note_validated[:2000]
-        
+
         body_validated = None
         if body:
             body_validated = sanitize_user_input(body, "general")
             if body_validated and len(body_validated) > 1000:
                 body_validated = body_validated[:1000]
-        
-        tags_validated = None
-        if tags:
-            tags_validated = sanitize_user_input(tags, "general")
-            if tags_validated and len(tags_validated) > 500:
-                tags_validated = tags_validated[:500]
-        
+
+        tags_validated = self._validate_json_list(tags, "general")
+
         # Validate valence and arousal
         if valence is not None:
             if not isinstance(valence, int) or valence < -5 or valence > 5:
                 valence = None
-        
+
         if arousal is not None:
             if not isinstance(arousal, int) or arousal < -5 or arousal > 5:
                 arousal = None
-        
+
+        # Timezone comes from the in-process cache: no SELECT inside the
+        # write transaction just to read one rarely-changing column
+        tz_name = self._get_user_timezone(user_id)
+        if tz_name is None:
+            raise ValueError(f"User {user_id} not found")
+
+        # Один clock read на запись: локальное время выводится из того же
+        # мгновения, что и created_at
+        now_utc = datetime.now(dt_timezone.utc)
+        local_time = now_utc.astimezone(_zoneinfo(tz_name)).replace(tzinfo=None)
+
+        return {
+            'user_id': user_id,
+            'ts_local': local_time,
+            'emotions': emotions_validated,
+            'cause': cause_validated,
+            'note': note_validated,
+            'valence': valence,
+            'arousal': arousal,
+            'body': body_validated,
+            'tags': tags_validated,
+            'created_at': now_utc,
+        }
+
+    def create_entry(self, user_id: int, emotions=None, cause: str = None,
+                    note: str = None, valence: int = None, arousal: int = None,
+                    body: str = None, tags=None) -> Entry:
+        """Create new emotion entry with comprehensive validation
+
+        emotions/tags: список строк или JSON-строка (старый интерфейс).
+        """
+        row = self._prepare_entry_row(user_id, emotions=emotions, cause=cause,
+                                      note=note, valence=valence, arousal=arousal,
+                                      body=body, tags=tags)
+
         try:
+            # Keep the session block minimal: build the row, insert,
+            # touch last_activity, commit.
             with self.get_session() as session:
-                # Get user timezone for local timestamp
-                user = session.query(User).filter(User.id == user_id).first()
-                if not user:
-                    raise ValueError(f"User {user_id} not found")
-                
-                import zoneinfo
-                tz = zoneinfo.ZoneInfo(user.timezone)
-                local_time = datetime.now(tz).replace(tzinfo=None)  # Store as naive datetime
-                
-                entry = Entry(
-                    user_id=user_id,
-                    ts_local=local_time,
-                    emotions=emotions_validated,
-                    cause=cause_validated,
-                    note=note_validated,
-                    valence=valence,
-                    arousal=arousal,
-                    body=body_validated,
-                    tags=tags_validated,
-                    created_at=datetime.now(dt_timezone.utc)
-                )
-                
+                entry = Entry(**row)
                 session.add(entry)
-                
-                # Update user last activity
-                user.last_activity = datetime.now(dt_timezone.utc)
-                
+
+                # Счётчики слов-причин едут в той же транзакции
+                if row['cause']:
+                    self._upsert_cause_tokens(session, user_id, row['cause'],
+                                              row['ts_local'].date())
+
                 session.commit()
                 session.refresh(entry)
-                
+
+                # last_activity is debounced instead of written per entry
+                self._touch_activity(user_id)
+
+                self._invalidate_global_stats()
                 logger.info(f"Created entry for user {user_id}")
                 return entry
-                
+
         except SQLAlchemyError as e:
             logger.error(f"Database error creating entry for user {user_id}: {e}")
             raise
+
+    def bulk_create_entries(self, rows: List[Dict[str, Any]]) -> int:
+        """Вставить несколько записей одним executemany INSERT.
+
+        rows: словари с полями create_entry (user_id обязателен в каждом).
+        Одна транзакция на всю пачку вместо коммита на запись - для
+        миграций и импортов это O(1) round-trip'ов вместо O(N).
+        """
+        if not rows:
+            return 0
+
+        prepared = [self._prepare_entry_row(**row) for row in rows]
+
+        try:
+            from sqlalchemy import insert
+            with self.get_session() as session:
+                with session.begin():
+                    session.execute(insert(Entry), prepared)
+                    for row in prepared:
+                        if row['cause']:
+                            self._upsert_cause_tokens(session, row['user_id'],
+                                                      row['cause'],
+                                                      row['ts_local'].date())
+
+            for uid in {row['user_id'] for row in prepared}:
+                self._touch_activity(uid)
+            self._invalidate_global_stats()
+            logger.info(f"Bulk-created {len(prepared)} entries")
+            return len(prepared)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error bulk-creating entries: {e}")
+            raise
     
     # NEW: Summary delivery tracking methods
     def record_summary_delivery(self, user_id: int, period_days: int = 7, 
                                delivery_type: str = 'automatic', entries_count: int = 0, 
                                success: bool = True):
         """Record that a summary was delivered to user"""
+        now_utc = datetime.now(dt_timezone.utc)
+
         try:
             with self.get_session() as session:
-                import zoneinfo
-                
-                # Get user timezone for local date
-                user = session.query(User).filter(User.id == user_id).first()
-                if user:
+                # Get user timezone for local date (через кэш, без SELECT);
+                # локальная дата выводится из того же мгновения, что created_at
+                tz_name = self._get_user_timezone(user_id)
+                if tz_name:
                     try:
-                        tz = zoneinfo.ZoneInfo(user.timezone)
-                        local_date = datetime.now(tz).date()
+                        local_date = now_utc.astimezone(_zoneinfo(tz_name)).date()
                     except Exception:
-                        local_date = datetime.now().date()
+                        local_date = now_utc.date()
                 else:
-                    local_date = datetime.now().date()
-                
+                    local_date = now_utc.date()
+
                 delivery = SummaryDelivery(
                     user_id=user_id,
                     delivery_date=local_date,
@@ -585,7 +1332,7 @@ class Database:
                     delivery_type=delivery_type,
                     entries_count=entries_count,
                     success=success,
-                    created_at=datetime.now(dt_timezone.utc)
+                    created_at=now_utc
                 )
                 
                 session.add(delivery)
@@ -600,51 +1347,84 @@ class Database:
         """Get the last summary delivery for user"""
         try:
             with self.get_session() as session:
-                return (session.query(SummaryDelivery)
-                       .filter(SummaryDelivery.user_id == user_id)
-                       .filter(SummaryDelivery.delivery_type == delivery_type)
-                       .filter(SummaryDelivery.success == True)
-                       .order_by(SummaryDelivery.created_at.desc())
-                       .first())
+                return session.execute(
+                    select(SummaryDelivery)
+                    .where(SummaryDelivery.user_id == user_id)
+                    .where(SummaryDelivery.delivery_type == delivery_type)
+                    .where(SummaryDelivery.success.is_(True))
+                    .order_by(SummaryDelivery.created_at.desc())
+                    .limit(1)
+                ).scalars().first()
         except SQLAlchemyError as e:
             logger.error(f"Database error getting last summary delivery for user {user_id}: {e}")
             return None
     
-    def get_user_entries(self, user_id: int, days: int = 7) -> List[Entry]:
-        """Get user entries from last N days with validation"""
+    def _entries_cutoff(self, user_id: int, days: int) -> Optional[datetime]:
+        """Нижняя граница ts_local за N дней в часовом поясе пользователя.
+
+        Возвращает None, если пользователь не найден или входные данные
+        некорректны - вызывающие методы в этом случае отдают пустой результат.
+        """
         if not isinstance(user_id, int) or user_id <= 0:
-            return []
-        
+            return None
+
         if not isinstance(days, int) or days <= 0:
             days = 7
-        
+
         # Limit days to reasonable range
         days = min(days, 365)
-        
+
+        tz_name = self._get_user_timezone(user_id)
+        if tz_name is None:
+            return None
+
+        tz = _zoneinfo(tz_name)
+        return (datetime.now(tz) - timedelta(days=days)).replace(tzinfo=None)
+
+    def get_user_entries(self, user_id: int, days: int = 7) -> List[Any]:
+        """Get user entries from last N days as Row tuples (read-only)"""
+        cutoff_date = self._entries_cutoff(user_id, days)
+        if cutoff_date is None:
+            return []
+
         try:
-            with self.get_session() as session:
-                from datetime import timedelta
-                
-                # Get user timezone
-                user = session.query(User).filter(User.id == user_id).first()
-                if not user:
-                    return []
-                
-                import zoneinfo
-                tz = zoneinfo.ZoneInfo(user.timezone)
-                cutoff_date = (datetime.now(tz) - timedelta(days=days)).replace(tzinfo=None)
-                
-                return (session.query(Entry)
-                       .filter(Entry.user_id == user_id)
-                       .filter(Entry.ts_local >= cutoff_date)
-                       .order_by(Entry.ts_local.desc())
-                       .limit(10000)  # Safety limit
-                       .all())
-                       
+            with self._read_connection() as conn:
+                # Core-выборка: записи только читаются (анализ, экспорт),
+                # мутаций не бывает - ORM-объекты здесь не нужны. N+1 через
+                # ленивые связи невозможен: Row не имеет relationships, а на
+                # ORM-путях связи объявлены lazy="raise" (см. модель User).
+                return conn.execute(
+                    _Q_ENTRIES_RANGE, {'uid': user_id, 'cut': cutoff_date}
+                ).all()
+
         except SQLAlchemyError as e:
             logger.error(f"Database error getting entries for user {user_id}: {e}")
             return []
-    
+
+    def has_any_entries(self, user_id: int, days: int = 7) -> bool:
+        """Check if user has at least one entry in the last N days.
+
+        Дешевле, чем get_user_entries + len(): EXISTS/LIMIT 1 вместо
+        выборки всех строк, когда нужен только факт наличия.
+        """
+        cutoff_date = self._entries_cutoff(user_id, days)
+        if cutoff_date is None:
+            return False
+
+        try:
+            with self._read_connection() as conn:
+                row = conn.execute(
+                    select(literal(1))
+                    .where(Entry.user_id == user_id)
+                    .where(Entry.ts_local >= cutoff_date)
+                    .limit(1)
+                ).first()
+            return row is not None
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error checking entries for user {user_id}: {e}")
+            return False
+
     def get_user_schedule(self, user_id: int, date_local: date) -> Optional[Schedule]:
         """Get user schedule for specific date with validation"""
         if not isinstance(user_id, int) or user_id <= 0:
@@ -655,10 +1435,9 @@ class Database:
         
         try:
             with self.get_session() as session:
-                return (session.query(Schedule)
-                       .filter(Schedule.user_id == user_id)
-                       .filter(Schedule.date_local == date_local)
-                       .first())
+                return session.execute(
+                    _GET_SCHEDULE_STMT, {'uid': user_id, 'dt': date_local}
+                ).scalar_one_or_none()
         except SQLAlchemyError as e:
             logger.error(f"Database error getting schedule for user {user_id}: {e}")
             return None
@@ -671,76 +1450,175 @@ class Database:
         if not isinstance(date_local, date):
             raise ValueError("Invalid date")
         
-        # Validate JSON
-        times_validated = sanitize_user_input(times_json, "general")
-        if not times_validated:
-            raise ValueError("Invalid times JSON")
-        
+        # Validate JSON structure first, then sanitize the elements -
+        # прогон всей JSON-строки через санитайзер срезал бы скобки
         try:
-            # Test JSON parsing
-            json.loads(times_validated)
-        except json.JSONDecodeError:
+            times_list = _json_loads(times_json)
+        except (ValueError, TypeError):
             raise ValueError("Invalid JSON format")
-        
+
+        if not isinstance(times_list, list) or not times_list:
+            raise ValueError("Invalid times JSON")
+
+        cleaned_times = []
+        for item in times_list:
+            item_clean = sanitize_user_input(str(item), "general")
+            if not item_clean:
+                raise ValueError("Invalid times JSON")
+            cleaned_times.append(item_clean)
+
+        now_utc = datetime.now(dt_timezone.utc)
+
         try:
             with self.get_session() as session:
+                if self.engine.url.drivername.startswith('sqlite'):
+                    # Один UPSERT вместо DELETE+INSERT: вдвое меньше
+                    # statements и записей в WAL на каждое сохранение
+                    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+                    stmt = sqlite_insert(Schedule).values(
+                        user_id=user_id,
+                        date_local=date_local,
+                        times_local=cleaned_times,
+                        created_at=now_utc
+                    ).on_conflict_do_update(
+                        index_elements=['user_id', 'date_local'],
+                        set_=dict(
+                            times_local=cleaned_times,
+                            created_at=now_utc
+                        )
+                    )
+                    session.execute(stmt)
+                    session.commit()
+                    return
+
                 with session.begin():
                     # Delete existing schedule for this date
-                    session.query(Schedule).filter(
-                        Schedule.user_id == user_id,
-                        Schedule.date_local == date_local
-                    ).delete()
-                    
+                    from sqlalchemy import delete
+                    session.execute(
+                        delete(Schedule)
+                        .where(Schedule.user_id == user_id)
+                        .where(Schedule.date_local == date_local)
+                    )
+
                     # Create new schedule
                     schedule = Schedule(
                         user_id=user_id,
                         date_local=date_local,
-                        times_local=times_validated,
-                        created_at=datetime.now(dt_timezone.utc)
+                        times_local=cleaned_times,
+                        created_at=now_utc
                     )
-                    
+
                     session.add(schedule)
-                    
+
         except SQLAlchemyError as e:
             logger.error(f"Database error saving schedule for user {user_id}: {e}")
             raise
-    
+
+    def save_user_schedules_bulk(self, user_id: int, schedules: List[tuple]):
+        """Save several (date_local, times_json) schedules in one transaction.
+
+        Один DELETE по списку дат плюс executemany INSERT вместо коммита
+        на каждую дату - на бэкфилле недели это на порядок меньше
+        round-trip'ов и записей в WAL.
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            raise ValueError("Invalid user_id")
+
+        if not schedules:
+            return
+
+        now_utc = datetime.now(dt_timezone.utc)
+        rows = []
+        for date_local, times_json in schedules:
+            if not isinstance(date_local, date):
+                raise ValueError("Invalid date")
+
+            try:
+                times_list = _json_loads(times_json)
+            except (ValueError, TypeError):
+                raise ValueError("Invalid JSON format")
+
+            if not isinstance(times_list, list) or not times_list:
+                raise ValueError("Invalid times JSON")
+
+            cleaned_times = []
+            for item in times_list:
+                item_clean = sanitize_user_input(str(item), "general")
+                if not item_clean:
+                    raise ValueError("Invalid times JSON")
+                cleaned_times.append(item_clean)
+
+            rows.append({
+                'user_id': user_id,
+                'date_local': date_local,
+                'times_local': cleaned_times,
+                'created_at': now_utc
+            })
+
+        try:
+            from sqlalchemy import delete, insert
+            with self.get_session() as session:
+                with session.begin():
+                    session.execute(
+                        delete(Schedule)
+                        .where(Schedule.user_id == user_id)
+                        .where(Schedule.date_local.in_([r['date_local'] for r in rows]))
+                    )
+                    # executemany: на Postgres срабатывает insertmanyvalues,
+                    # на SQLite - переиспользование prepared statement
+                    session.execute(insert(Schedule), rows)
+
+            logger.info(f"Saved {len(rows)} schedules for user {user_id}")
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error bulk-saving schedules for user {user_id}: {e}")
+            raise
+
+    # TTL кэша глобальной статистики: /stats опрашивается чаще, чем
+    # меняются агрегаты, а 60 секунд устаревания здесь безвредны
+    _GLOBAL_STATS_TTL = 60.0
+
     def get_global_stats(self) -> Dict[str, int]:
         """Get global bot statistics (no personal data) with error handling"""
+        import time as _time
+
+        with self._stats_cache_lock:
+            cached = self._global_stats_cache
+            if cached is not None and cached[0] > _time.monotonic():
+                return dict(cached[1])
+
+        stats = self._compute_global_stats()
+
+        with self._stats_cache_lock:
+            self._global_stats_cache = (_time.monotonic() + self._GLOBAL_STATS_TTL, stats)
+
+        return dict(stats)
+
+    def _invalidate_global_stats(self):
+        """Сбросить кэш глобальной статистики (новый пользователь/запись)"""
+        with self._stats_cache_lock:
+            self._global_stats_cache = None
+
+    def _compute_global_stats(self) -> Dict[str, int]:
+        """Run the actual aggregate queries behind get_global_stats"""
         try:
-            with self.get_session() as session:
-                from datetime import timedelta
-                
-                # Total users
-                total_users = session.query(User).count()
-                
-                # Total entries
-                total_entries = session.query(Entry).count()
-                
-                # Active users (last 7 days)
+            # AUTOCOMMIT-соединение: чистое чтение, ORM-сессия и неявная
+            # транзакция здесь не нужны
+            with self._read_connection() as conn:
+                # Одна граница недели на все агрегаты
                 week_ago = datetime.now(dt_timezone.utc) - timedelta(days=7)
-                active_weekly = (session.query(User)
-                                .filter(User.last_activity >= week_ago)
-                                .count())
-                
-                # Users with weekly summary enabled
-                weekly_summary_users = (session.query(UserSettings)
-                                       .filter(UserSettings.weekly_summary_enabled == True)
-                                       .count())
-                
-                # Summary deliveries this week
-                week_start = datetime.now(dt_timezone.utc) - timedelta(days=7)
-                summaries_this_week = (session.query(SummaryDelivery)
-                                      .filter(SummaryDelivery.created_at >= week_start)
-                                      .filter(SummaryDelivery.success == True)
-                                      .count())
-                
+
+                # Все пять агрегатов одной строкой
+                row = conn.execute(
+                    _STMT_GLOBAL_STATS, {'cutoff': week_ago}
+                ).one()
+
                 return {
-                    'total_users': total_users,
-                    'total_entries': total_entries,
-                    'active_weekly': active_weekly,
-                    'weekly_summary_users': weekly_summary_users,
-                    'summaries_this_week': summaries_this_week
+                    'total_users': row.total_users,
+                    'total_entries': row.total_entries,
+                    'active_weekly': row.active_weekly,
+                    'weekly_summary_users': row.weekly_summary_users,
+                    'summaries_this_week': row.summaries_this_week
                 }
                 
         except SQLAlchemyError as e:
@@ -755,94 +1633,299 @@ class Database:
     
     def get_emotion_frequencies(self, user_id: int, days: int = 7) -> Dict[str, int]:
         """Get emotion word frequencies for user with validation"""
-        entries = self.get_user_entries(user_id, days)
-        
-        emotion_counts = {}
-        
-        for entry in entries:
-            if entry.emotions:
-                try:
-                    emotions_list = json.loads(entry.emotions)
-                    for emotion in emotions_list:
-                        if isinstance(emotion, str):
-                            emotion_clean = sanitize_user_input(emotion, "emotion")
-                            if emotion_clean:
-                                emotion_counts[emotion_clean] = emotion_counts.get(emotion_clean, 0) + 1
-                except (json.JSONDecodeError, TypeError):
-                    # Handle plain text emotions
-                    emotion_clean = sanitize_user_input(entry.emotions, "emotion")
+        cutoff = self._entries_cutoff(user_id, days)
+        if cutoff is None:
+            return {}
+
+        try:
+            with self._read_connection() as conn:
+                return self._emotion_frequencies_on(conn, user_id, cutoff)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting emotion frequencies for user {user_id}: {e}")
+            return {}
+
+    def _emotion_frequencies_on(self, conn, user_id: int, cutoff: datetime) -> Dict[str, int]:
+        """Агрегация частот эмоций на уже открытом соединении"""
+        emotion_counts: Counter = Counter()
+
+        if self.engine.url.drivername.startswith('sqlite'):
+            # json_each разворачивает и группирует массивы на стороне
+            # SQL: в Python приходит O(групп) строк вместо O(записей)
+            rows = conn.execute(text(
+                "SELECT je.value, COUNT(*) "
+                "FROM entries, json_each(entries.emotions) AS je "
+                "WHERE entries.user_id = :uid "
+                "  AND entries.ts_local >= :cutoff "
+                "  AND entries.emotions IS NOT NULL "
+                "  AND json_valid(entries.emotions) "
+                "GROUP BY je.value"
+            ), {'uid': user_id, 'cutoff': cutoff}).all()
+            for emotion, count in rows:
+                if isinstance(emotion, str):
+                    emotion_clean = _sanitize_emotion(emotion)
                     if emotion_clean:
-                        emotion_counts[emotion_clean] = emotion_counts.get(emotion_clean, 0) + 1
-        
-        return emotion_counts
-    
+                        emotion_counts[emotion_clean] += count
+            # Записи с эмоциями простым текстом (не JSON)
+            legacy_rows = conn.execute(text(
+                "SELECT entries.emotions, COUNT(*) FROM entries "
+                "WHERE entries.user_id = :uid "
+                "  AND entries.ts_local >= :cutoff "
+                "  AND entries.emotions IS NOT NULL "
+                "  AND NOT json_valid(entries.emotions) "
+                "GROUP BY entries.emotions"
+            ), {'uid': user_id, 'cutoff': cutoff}).all()
+            for raw_emotion, count in legacy_rows:
+                emotion_clean = _sanitize_emotion(raw_emotion)
+                if emotion_clean:
+                    emotion_counts[emotion_clean] += count
+        else:
+            # Общий путь: стримим только колонку emotions, без ORM
+            result = conn.execution_options(stream_results=True, yield_per=1000).execute(
+                select(Entry.emotions)
+                .where(Entry.user_id == user_id)
+                .where(Entry.ts_local >= cutoff)
+                .where(Entry.emotions.isnot(None))
+            )
+            for (raw,) in result:
+                # JSON-колонка отдаёт list; легаси-строки - как есть.
+                # filter/map работают в C-цикле - заметно на тысячах
+                # токенов против питоновского генератора
+                emotions_list = raw if isinstance(raw, list) else [raw]
+                emotion_counts.update(filter(None, map(
+                    _sanitize_emotion,
+                    filter(lambda e: type(e) is str, emotions_list)
+                )))
+
+        return dict(emotion_counts)
+
     def get_cause_frequencies(self, user_id: int, days: int = 7) -> Dict[str, int]:
         """Get cause/trigger frequencies for user with validation"""
-        entries = self.get_user_entries(user_id, days)
-        
-        cause_counts = {}
-        
-        for entry in entries:
-            if entry.cause:
-                cause_clean = sanitize_user_input(entry.cause, "cause")
-                if cause_clean:
-                    # Simple keyword extraction (in production, use NLP)
-                    words = cause_clean.lower().split()
-                    for word in words:
-                        if len(word) > 3:  # Skip short words
-                            word_clean = sanitize_user_input(word, "general")
-                            if word_clean:
-                                cause_counts[word_clean] = cause_counts.get(word_clean, 0) + 1
-        
-        return cause_counts
-    
+        cutoff = self._entries_cutoff(user_id, days)
+        if cutoff is None:
+            return {}
+
+        try:
+            with self._read_connection() as conn:
+                return self._cause_frequencies_on(conn, user_id, cutoff)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting cause frequencies for user {user_id}: {e}")
+            return {}
+
+    def _cause_frequencies_on(self, conn, user_id: int, cutoff: datetime) -> Dict[str, int]:
+        """Агрегация частот слов-причин на уже открытом соединении"""
+        # Материализованные счётчики: токенизация уже выполнена
+        # на записи, здесь только суммирование по дням окна
+        cause_counts: Counter = Counter()
+        first_bucket = None
+        rows = conn.execute(
+            select(CauseTokenCount.token, func.sum(CauseTokenCount.count))
+            .where(CauseTokenCount.user_id == user_id)
+            .where(CauseTokenCount.date_bucket >= cutoff.date())
+            .group_by(CauseTokenCount.token)
+        ).all()
+        if rows:
+            cause_counts.update({token: int(total) for token, total in rows})
+            first_bucket = conn.execute(
+                select(func.min(CauseTokenCount.date_bucket))
+                .where(CauseTokenCount.user_id == user_id)
+            ).scalar()
+
+        # Легаси-путь сливается с суммами, а не заменяется ими: записи
+        # старше самого раннего бакета созданы до материализованной
+        # таблицы и в счётчики не попали. После бэкфилла на старте этот
+        # диапазон обычно пуст, и стрим не отдаёт ни одной строки
+        legacy = (
+            select(Entry.cause)
+            .where(Entry.user_id == user_id)
+            .where(Entry.ts_local >= cutoff)
+            .where(Entry.cause.isnot(None))
+        )
+        if first_bucket is not None:
+            legacy = legacy.where(
+                Entry.ts_local < datetime.combine(first_bucket, datetime.min.time())
+            )
+        result = conn.execution_options(stream_results=True, yield_per=1000).execute(legacy)
+        # cause уже прошёл санитизацию в create_entry - на чтении
+        # достаточно дешёвого lower().split() без повторных regex
+        for (cause,) in result:
+            cause_counts.update(_cause_tokens(cause))
+
+        return dict(cause_counts)
+
     def get_time_distribution(self, user_id: int, days: int = 7) -> Dict[int, int]:
         """Get distribution of entries by hour of day with validation"""
-        entries = self.get_user_entries(user_id, days)
-        
-        hour_counts = {}
-        
-        for entry in entries:
-            hour = entry.ts_local.hour
+        cutoff = self._entries_cutoff(user_id, days)
+        if cutoff is None:
+            return {}
+
+        try:
+            with self._read_connection() as conn:
+                return self._time_distribution_on(conn, user_id, cutoff)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting time distribution for user {user_id}: {e}")
+            return {}
+
+    def _time_distribution_on(self, conn, user_id: int, cutoff: datetime) -> Dict[int, int]:
+        """Распределение записей по часам на уже открытом соединении"""
+        if self.engine.url.drivername.startswith('sqlite'):
+            # Группировка по часу прямо в SQL
+            rows = conn.execute(
+                select(func.strftime('%H', Entry.ts_local), func.count())
+                .where(Entry.user_id == user_id)
+                .where(Entry.ts_local >= cutoff)
+                .group_by(func.strftime('%H', Entry.ts_local))
+            ).all()
+            return {int(hour): count for hour, count in rows
+                    if hour is not None and 0 <= int(hour) <= 23}
+
+        hour_counts: Dict[int, int] = {}
+        for (ts_local,) in conn.execute(
+            select(Entry.ts_local)
+            .where(Entry.user_id == user_id)
+            .where(Entry.ts_local >= cutoff)
+        ):
+            hour = ts_local.hour
             if 0 <= hour <= 23:  # Validate hour
                 hour_counts[hour] = hour_counts.get(hour, 0) + 1
-        
         return hour_counts
+
+    def compute_all_stats(self, user_id: int, days: int = 7) -> Dict[str, Dict]:
+        """Все три разреза статистики за один заход.
+
+        Дашборд недельной сводки дергал три метода подряд - три
+        соединения и три вычисления окна. Здесь окно считается один раз
+        и все агрегаты идут по одному AUTOCOMMIT-соединению; сами запросы
+        остаются SQL-side (см. _*_on хелперы).
+        """
+        empty = {'emotions': {}, 'causes': {}, 'time_distribution': {}}
+        cutoff = self._entries_cutoff(user_id, days)
+        if cutoff is None:
+            return empty
+
+        try:
+            with self._read_connection() as conn:
+                return {
+                    'emotions': self._emotion_frequencies_on(conn, user_id, cutoff),
+                    'causes': self._cause_frequencies_on(conn, user_id, cutoff),
+                    'time_distribution': self._time_distribution_on(conn, user_id, cutoff),
+                }
+        except SQLAlchemyError as e:
+            logger.error(f"Database error computing stats for user {user_id}: {e}")
+            return empty
     
+    # Размер пачки и потолок итераций для чистки старых расписаний
+    _CLEANUP_BATCH = 1000
+    _CLEANUP_MAX_BATCHES = 100
+
+    # Счётчики причин обязаны жить не меньше максимального окна
+    # статистики (365 дней в _entries_cutoff); запас покрывает
+    # смещения часовых поясов пользователей
+    _CAUSE_TOKEN_RETENTION_DAYS = 370
+
     def cleanup_old_schedules(self, days_old: int = 7):
-        """Clean up old schedule records with safety limits"""
+        """Clean up old schedule records in bounded batches"""
         if not isinstance(days_old, int) or days_old < 1:
             days_old = 7
-        
+
         # Safety limit: don't delete schedules newer than 1 day
         days_old = max(days_old, 1)
-        
+
+        cutoff_date = datetime.now().date() - timedelta(days=days_old)
+
+        # Пачки по rowid с коммитом между итерациями: короткие транзакции
+        # не держат WAL, а потолок итераций страхует от бесконечного цикла
+        total_deleted = 0
         try:
-            with self.get_session() as session:
-                from datetime import timedelta
-                
-                cutoff_date = datetime.now().date() - timedelta(days=days_old)
-                
-                # Use limit to prevent accidental mass deletion
-                deleted = (session.query(Schedule)
-                          .filter(Schedule.date_local < cutoff_date)
-                          .limit(1000)  # Safety limit
-                          .delete(synchronize_session=False))
-                
-                session.commit()
-                
-                if deleted > 0:
-                    logger.info(f"Cleaned up {deleted} old schedule records")
-                    
+            with self.engine.connect() as conn:
+                for _ in range(self._CLEANUP_MAX_BATCHES):
+                    if self.engine.url.drivername.startswith('sqlite'):
+                        result = conn.execute(text(
+                            "DELETE FROM schedules WHERE rowid IN "
+                            "(SELECT rowid FROM schedules "
+                            " WHERE date_local < :cutoff LIMIT :batch)"
+                        ), {'cutoff': cutoff_date, 'batch': self._CLEANUP_BATCH})
+                    else:
+                        from sqlalchemy import delete
+                        result = conn.execute(
+                            delete(Schedule)
+                            .where(Schedule.id.in_(
+                                select(Schedule.id)
+                                .where(Schedule.date_local < cutoff_date)
+                                .limit(self._CLEANUP_BATCH)
+                            ))
+                        )
+                    conn.commit()
+
+                    total_deleted += result.rowcount
+                    if result.rowcount < self._CLEANUP_BATCH:
+                        break
+
+            if total_deleted > 0:
+                logger.info(f"Cleaned up {total_deleted} old schedule records")
+
         except SQLAlchemyError as e:
             logger.error(f"Database error during cleanup: {e}")
+
+    def cleanup_old_cause_tokens(self, days_old: int = _CAUSE_TOKEN_RETENTION_DAYS):
+        """Clean up stale cause token counters in bounded batches.
+
+        Запросы статистики смотрят до 365 дней назад (_entries_cutoff),
+        поэтому окно удаления зажато снизу сроком хранения: бакеты внутри
+        запрашиваемой глубины трогать нельзя, иначе суммы станут неполными.
+        """
+        if not isinstance(days_old, int) or days_old < self._CAUSE_TOKEN_RETENTION_DAYS:
+            days_old = self._CAUSE_TOKEN_RETENTION_DAYS
+
+        cutoff_date = datetime.now().date() - timedelta(days=days_old)
+
+        total_deleted = 0
+        try:
+            with self.engine.connect() as conn:
+                for _ in range(self._CLEANUP_MAX_BATCHES):
+                    if self.engine.url.drivername.startswith('sqlite'):
+                        result = conn.execute(text(
+                            "DELETE FROM cause_token_counts WHERE rowid IN "
+                            "(SELECT rowid FROM cause_token_counts "
+                            " WHERE date_bucket < :cutoff LIMIT :batch)"
+                        ), {'cutoff': cutoff_date, 'batch': self._CLEANUP_BATCH})
+                    else:
+                        from sqlalchemy import delete
+                        result = conn.execute(
+                            delete(CauseTokenCount)
+                            .where(CauseTokenCount.id.in_(
+                                select(CauseTokenCount.id)
+                                .where(CauseTokenCount.date_bucket < cutoff_date)
+                                .limit(self._CLEANUP_BATCH)
+                            ))
+                        )
+                    conn.commit()
+
+                    total_deleted += result.rowcount
+                    if result.rowcount < self._CLEANUP_BATCH:
+                        break
+
+            if total_deleted > 0:
+                logger.info(f"Cleaned up {total_deleted} old cause token records")
+
+        except SQLAlchemyError as e:
+            logger.error(f"Database error during cause token cleanup: {e}")
     
+    # Окно, в течение которого повторный health_check не трогает БД
+    _HEALTH_CHECK_TTL = 5.0
+
     def health_check(self) -> bool:
         """Simple database health check"""
+        import time as _time
+
+        # Недавний успешный пинг - считаем БД живой без round-trip
+        if _time.monotonic() - self._last_health_ok < self._HEALTH_CHECK_TTL:
+            return True
+
         try:
-            with self.get_session() as session:
-                session.execute("SELECT 1").fetchone()
-                return True
+            with self._read_connection() as conn:
+                conn.scalar(_PING)
+            self._last_health_ok = _time.monotonic()
+            return True
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
             return False
@@ -850,16 +1933,11 @@ class Database:
 
 def test_database():
     """Enhanced database test with user settings and summary tracking"""
-    import tempfile
-    import os
-    
-    # Create temporary database
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        test_db_path = f.name
-    
+    # In-memory база со StaticPool: без tempfile и fsync тест крутится
+    # на порядок быстрее, персистентность ему не нужна
+    db = Database('sqlite://')
+
     try:
-        db = Database(f'sqlite:///{test_db_path}')
-        
         # Test health check
         assert db.health_check(), "Health check failed"
         
@@ -867,6 +1945,15 @@ def test_database():
         user = db.create_user(12345, 67890, 'Europe/Moscow')
         assert user.id == 12345
         assert user.chat_id == 67890
+
+        # Test that unloaded relationships raise instead of lazy-loading
+        from sqlalchemy.exc import InvalidRequestError
+        fetched = db.get_user(12345)
+        try:
+            _ = fetched.settings
+            assert False, "lazy='raise' did not block lazy load"
+        except InvalidRequestError:
+            pass
         
         # Test comprehensive user settings
         settings = db.get_user_settings(12345)
@@ -900,7 +1987,20 @@ def test_database():
             note='отличное настроение'
         )
         assert entry.user_id == 12345
-        
+        # JSON-колонка: эмоции хранятся готовым списком, без повторного парсинга
+        assert entry.emotions == ['радость', 'удовлетворение']
+
+        # Test schedule round-trip through the JSON column
+        db.save_user_schedule(12345, date.today(), '["09:00", "14:30"]')
+        sch = db.get_user_schedule(12345, date.today())
+        assert sch is not None
+        assert sch.times_local == ['09:00', '14:30']
+
+        # Test debounced activity flush
+        assert 12345 in db._pending_activity
+        db.flush_pending_activity()
+        assert len(db._pending_activity) == 0
+
         # Test summary delivery recording
         db.record_summary_delivery(12345, period_days=7, entries_count=5)
         last_delivery = db.get_last_summary_delivery(12345)
@@ -928,10 +2028,10 @@ def test_database():
         assert len(weekly_users) >= 1
         
         print("Enhanced database tests passed!")
-        
+
     finally:
         # Cleanup
-        os.unlink(test_db_path)
+        db.engine.dispose()
 
 
 if __name__ == "__main__":
@@ -5,7 +5,86 @@ Based on established emotion theories and NVC principles
 Updated with new features: interactive summaries and settings
 """
 
-class Texts:
+import json
+import random
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from types import MappingProxyType
+from heapq import nlargest, nsmallest
+from operator import itemgetter
+
+_LOCALES_DIR = Path(__file__).resolve().parent.parent / 'locales'
+_LANG = 'ru'
+
+# Реестр ленивых атрибутов: имя -> пространство имён (файл locales/<lang>/<ns>.json).
+# Горячие тексты чек-инов и EMOTION_CATEGORIES (на нём строятся индексы при
+# импорте) остаются литералами в классе ниже.
+_ATTR_NAMESPACE = {
+    'ONBOARDING': 'onboarding',
+    'HELP': 'help',
+    'PRIVACY_NOTICE': 'help',
+    'WEEKLY_SUMMARY_TEMPLATE': 'summary',
+    'STATS_TEMPLATE': 'summary',
+    'SUMMARY_PERIOD_SELECTION': 'summary',
+    'SUMMARY_GENERATING': 'summary',
+    'SUMMARY_CUSTOM_PERIOD_REQUEST': 'summary',
+    'SUMMARY_PERIOD_ERROR': 'summary',
+    'NO_DATA_MESSAGE': 'summary',
+    'NO_DATA_FOR_PERIOD': 'summary',
+    'AUTO_SUMMARY_HEADER': 'summary',
+    'AUTO_SUMMARY_INTRO': 'summary',
+    'SETTINGS_MAIN': 'settings',
+    'SETTINGS_WEEKLY_ENABLED': 'settings',
+    'SETTINGS_WEEKLY_DISABLED': 'settings',
+    'SETTINGS_TIME_SELECTION': 'settings',
+    'SETTINGS_SAVED': 'settings',
+    'SETTINGS_ERROR': 'settings',
+    'INSIGHT_TEMPLATES': 'insights',
+    'CSV_HEADERS': 'common',
+    'BUTTON_TEXTS': 'common',
+    'PERIOD_NAMES': 'common',
+}
+
+
+@lru_cache(maxsize=None)
+def _load_namespace(namespace: str) -> dict:
+    """Load one locale namespace from disk (once per process)."""
+    with open(_LOCALES_DIR / _LANG / f'{namespace}.json', 'rb') as fh:
+        return json.load(fh)
+
+
+class _LazyTexts(type):
+    """Метакласс: при первом обращении к тексту подгружает его пространство
+    имён из locales/ и кэширует значения обычными атрибутами класса."""
+
+    def _install_namespace(cls, namespace):
+        for key, value in _load_namespace(namespace).items():
+            if isinstance(value, str):
+                value = _minify_html(value)
+            elif key == 'PERIOD_NAMES':
+                # JSON хранит ключи строками, код ожидает int
+                value = MappingProxyType({int(days): name for days, name in value.items()})
+            elif isinstance(value, dict):
+                # Словари (INSIGHT_TEMPLATES, BUTTON_TEXTS) отдаются read-only,
+                # чтобы вызывающие могли алиасить их без защитных копий
+                value = MappingProxyType({k: _minify_html(v) if isinstance(v, str) else v
+                                          for k, v in value.items()})
+            elif isinstance(value, list):
+                value = tuple(value)
+            setattr(cls, key, value)
+
+    def __getattr__(cls, name):
+        namespace = _ATTR_NAMESPACE.get(name)
+        if namespace is None:
+            raise AttributeError(name)
+        cls._install_namespace(namespace)
+        return cls.__dict__[name]
+
+
+class Texts(metaclass=_LazyTexts):
     """
     Text constants based on emotion research:
     - Russell's Circumplex Model (valence × arousal)
@@ -14,60 +93,25 @@ class Texts:
     - Affect Labeling research (verbalization reduces intensity)
     - Cognitive Appraisal Theory (context influences emotions)
     """
-    
-    # Onboarding and help - UPDATED
-    ONBOARDING = """
-🎭 <b>Добро пожаловать в EmoJournal!</b>
 
-Я помогу тебе отслеживать эмоции и находить закономерности в настроении.
+    # Экземпляры не несут состояния — без __dict__ они бесплатны
+    __slots__ = ()
 
-<b>Как это работает:</b>
-• 4 раза в день я спрошу, как дела (в 9:00, 13:00, 17:00, 21:00)
-• Ты можешь ответить или пропустить
-• Каждое воскресенье в 21:00 пришлю сводку за неделю (можно отключить в /settings)
-• Можешь записать эмоцию в любой момент: /note
-• Смотри сводки за любой период: /summary
-• Настрой свой часовой пояс: /timezone
+    def __getattr__(self, name):
+        # Доступ через экземпляр (self.texts.ONBOARDING) идёт тем же ленивым путём
+        return getattr(type(self), name)
 
-<b>Научная основа:</b>
-Простое называние эмоций (affect labeling) снижает их интенсивность и помогает лучше понимать себя.
+    @classmethod
+    def preload(cls, namespaces):
+        """Warm locale namespaces ahead of a burst (e.g. the Sunday summary job)"""
+        for namespace in namespaces:
+            cls._install_namespace(namespace)
 
-<b>Приватность:</b>
-Все данные хранятся локально на защищенном сервере, только у тебя есть доступ. Экспорт доступен по команде /export, удаление — /delete_me.
+    @classmethod
+    def all_emotions(cls):
+        """Flat tuple of every tracked emotion word (parallel to categories)"""
+        return _ALL_EMOTIONS
 
-Начнём? Используй /help для списка команд или /note чтобы записать эмоцию прямо сейчас.
-"""
-    
-    # UPDATED HELP
-    HELP = """
-<b>🎭 EmoJournal — твой эмоциональный дневник</b>
-
-<b>Команды:</b>
-/note — записать эмоцию сейчас
-/summary — интерактивные сводки за любой период
-/settings — настройки автосаммари и времени
-/export — выгрузка данных в CSV  
-/timezone — настройка часового пояса
-/pause — приостановить уведомления
-/resume — возобновить уведомления
-/delete_me — удалить все данные
-/stats — общая статистика бота
-
-<b>Автоматические саммари:</b>
-Каждое воскресенье в 21:00 (или в выбранное тобой время) получай сводку за неделю. Можно отключить в /settings.
-
-<b>Интерактивные сводки:</b>
-Команда /summary покажет кнопки выбора периода: 7 дней, 2 недели, месяц, 3 месяца или свой период.
-
-<b>Как это помогает:</b>
-Исследования показывают, что вербализация эмоций (affect labeling) активирует префронтальную кору и снижает активность миндалевидного тела, что помогает регулировать эмоции.
-
-Отслеживание закономерностей (время, триггеры, контекст) развивает эмоциональную осознанность.
-
-<b>Не заменяет:</b>
-Помощь специалистов при серьёзных проблемах с психическим здоровьем.
-    """
-    
     # Emotion check-in prompts
     EMOTION_PING = """
 🌟 Как ты сейчас?
@@ -135,153 +179,77 @@ class Texts:
     
     SKIP_RESPONSE = "Хорошо, сегодня больше не побеспокою 😊"
     
-    # NEW: Summary interface texts
-    SUMMARY_PERIOD_SELECTION = """
-📊 За какой период показать сводку?
-
-Выбери готовый период или укажи свой:
-    """
-    
-    SUMMARY_GENERATING = "📊 Генерирую сводку..."
-    
-    SUMMARY_CUSTOM_PERIOD_REQUEST = """
-📊 Введите количество дней для анализа (от 1 до 90):
-
-Например: 14 (для двух недель)
-    """
-    
-    SUMMARY_PERIOD_ERROR = "Количество дней должно быть от 1 до 90. Попробуйте еще раз."
-    
-    # NEW: Settings texts
-    SETTINGS_MAIN = """
-⚙️ <b>Настройки EmoJournal</b>
-
-📅 <b>Автоматические саммари:</b> {weekly_status}
-🕘 <b>Время отправки:</b> каждое воскресенье в {hour:02d}:00
-
-Выберите что хотите изменить:
-    """
-    
-    SETTINGS_WEEKLY_ENABLED = "✅ Включены"
-    SETTINGS_WEEKLY_DISABLED = "❌ Отключены"
-    
-    SETTINGS_TIME_SELECTION = """
-🕘 Выберите время для получения еженедельных саммари:
-
-Саммари будут приходить каждое воскресенье в выбранное время.
-    """
-    
-    SETTINGS_SAVED = "✅ Настройки сохранены!"
-    
-    SETTINGS_ERROR = "Произошла ошибка при изменении настройки."
-    
-    # Weekly summary template (legacy - сейчас используется новая логика в analysis.py)
-    WEEKLY_SUMMARY_TEMPLATE = """
-📊 <b>Твоя неделя в эмоциях</b>
-
-<b>🎭 Чаще всего:</b>
-{top_emotions}
-
-<b>🔍 Частые причины:</b>  
-{top_triggers}
-
-<b>⏰ Пик активности:</b>
-{peak_hours}
-
-<b>📈 Всего записей:</b> {total_entries}
-
-{insights}
-
-<i>Хочешь подробности? Используй /export для CSV-файла.</i>
-    """
-    
-    NO_DATA_MESSAGE = """
-📭 У тебя пока нет записей эмоций.
-
-Используй /note чтобы записать свою первую эмоцию, или просто отвечай на мои ежедневные вопросы в 9:00, 13:00, 17:00 и 21:00!
-    """
-    
-    NO_DATA_FOR_PERIOD = "📭 За этот период записей нет."
-    
-    # NEW: Automatic summary texts
-    AUTO_SUMMARY_HEADER = "📅 <b>Автоматическая сводка за неделю</b>"
-    
-    AUTO_SUMMARY_INTRO = """
-📅 <b>Твоя неделя подошла к концу!</b>
-
-Вот что удалось отследить за последние 7 дней:
-    """
-    
     # Emotion categories (сохраняем для совместимости с интерфейсом)
-    EMOTION_CATEGORIES = {
-        'joy': {
+    # Read-only снимок: кортежи компактнее списков, MappingProxyType защищает от мутаций
+    EMOTION_CATEGORIES = MappingProxyType({
+        'joy': MappingProxyType({
             'name': 'Радость/Удовлетворение',
-            'emotions': [
+            'emotions': (
                 'радость', 'счастье', 'восторг', 'удовлетворение', 
                 'благодарность', 'вдохновение', 'эйфория', 'блаженство',
                 'ликование', 'восхищение', 'умиление'
-            ]
-        },
-        'interest': {
+            )
+        }),
+        'interest': MappingProxyType({
             'name': 'Интерес/Любопытство', 
-            'emotions': [
+            'emotions': (
                 'интерес', 'любопытство', 'увлечённость', 'восхищение',
                 'предвкушение', 'азарт', 'энтузиазм', 'воодушевление'
-            ]
-        },
-        'calm': {
+            )
+        }),
+        'calm': MappingProxyType({
             'name': 'Спокойствие/Умиротворение',
-            'emotions': [
+            'emotions': (
                 'спокойствие', 'умиротворение', 'расслабленность', 'безмятежность',
                 'принятие', 'гармония', 'баланс', 'центрированность', 'покой'
-            ]
-        },
-        'anxiety': {
+            )
+        }),
+        'anxiety': MappingProxyType({
             'name': 'Тревога/Беспокойство',
-            'emotions': [
+            'emotions': (
                 'тревога', 'беспокойство', 'нервозность', 'волнение',
                 'напряжение', 'страх', 'паника', 'опасения', 'встревоженность'
-            ]
-        },
-        'sadness': {
+            )
+        }),
+        'sadness': MappingProxyType({
             'name': 'Грусть/Печаль',
-            'emotions': [
+            'emotions': (
                 'грусть', 'печаль', 'тоска', 'уныние', 'разочарование',
                 'сожаление', 'меланхолия', 'горе', 'скорбь', 'подавленность'
-            ]
-        },
-        'anger': {
+            )
+        }),
+        'anger': MappingProxyType({
             'name': 'Злость/Раздражение',
-            'emotions': [
+            'emotions': (
                 'злость', 'раздражение', 'гнев', 'возмущение', 'обида',
                 'фрустрация', 'досада', 'негодование', 'ярость', 'недовольство'
-            ]
-        },
-        'shame': {
+            )
+        }),
+        'shame': MappingProxyType({
             'name': 'Стыд/Вина',
-            'emotions': [
+            'emotions': (
                 'стыд', 'вина', 'смущение', 'неловкость', 'сожаление',
                 'самокритика', 'раскаяние', 'угрызения совести'
-            ]
-        },
-        'fatigue': {
+            )
+        }),
+        'fatigue': MappingProxyType({
             'name': 'Усталость/Истощение',
-            'emotions': [
+            'emotions': (
                 'усталость', 'истощение', 'вялость', 'апатия', 
                 'безразличие', 'выгорание', 'изнеможение', 'опустошённость'
-            ]
-        },
-        'excitement': {
+            )
+        }),
+        'excitement': MappingProxyType({
             'name': 'Оживление/Энергия',
-            'emotions': [
+            'emotions': (
                 'оживление', 'энергия', 'бодрость', 'живость',
                 'активность', 'подъём', 'драйв', 'динамизм'
-            ]
-        }
-    }
+            )
+        })
+    })
     
     # Contextual prompts for cognitive appraisal
-    CONTEXT_PROMPTS = [
+    CONTEXT_PROMPTS = (
         "Что происходило прямо перед этим?",
         "О чём ты думал(а) в этот момент?", 
         "Где ты находился(ась)?",
@@ -289,48 +257,8 @@ class Texts:
         "Что изменилось в последнее время?",
         "Какие ожидания были у тебя?",
         "Что показалось особенно важным?"
-    ]
-    
-    # Insight templates for weekly analysis
-    INSIGHT_TEMPLATES = {
-        'work_stress_evening': """
-💡 <b>Замечание:</b> Часто тревога проявляется вечером, а триггер связан с работой. 
-Возможно, стоит попробовать короткий ритуал "переключения" после рабочего дня?
-        """,
-        
-        'morning_anxiety': """
-💡 <b>Замечание:</b> Тревога часто появляется утром. 
-Может помочь 2-минутная дыхательная практика или планирование дня с вечера.
-        """,
-        
-        'weekend_joy': """
-💡 <b>Замечание:</b> По выходным настроение заметно лучше. 
-Что из "выходного режима" можно привнести в будни?
-        """,
-        
-        'social_energy': """
-💡 <b>Замечание:</b> Общение с людьми часто даёт энергию. 
-Возможно, стоит планировать больше социальных активностей?
-        """,
-        
-        'evening_fatigue': """
-💡 <b>Замечание:</b> Усталость накапливается к вечеру. 
-Короткие перерывы в течение дня могут помочь сохранить энергию.
-        """
-    }
+    )
     
-    # Export CSV headers (Russian)
-    CSV_HEADERS = [
-        'Дата',
-        'Время', 
-        'Валентность',
-        'Активация',
-        'Эмоции',
-        'Причина',
-        'Телесные ощущения',
-        'Заметка',
-        'Теги'
-    ]
     
     # Command responses
     TIMEZONE_SET = "Часовой пояс установлен: {timezone}"
@@ -362,15 +290,6 @@ class Texts:
     EXPORT_SUCCESS = "Ваши данные в формате CSV"
     
     # UPDATED STATS TEMPLATE
-    STATS_TEMPLATE = """
-📊 <b>Статистика EmoJournal:</b>
-
-👥 Всего пользователей: {total_users}
-📝 Всего записей: {total_entries}  
-📅 Активных за неделю: {active_weekly}
-📊 Подписано на саммари: {weekly_summary_users}
-    """
-    
     # Error messages
     ERROR_RATE_LIMIT = "Слишком много команд. Попробуйте через пару секунд."
     ERROR_GENERIC = "Что-то пошло не так. Попробуйте позже."
@@ -380,135 +299,238 @@ class Texts:
     INTENSITY_INVALID = "Укажите число от 0 до 10, или отправьте любой текст для пропуска."
     
     # Motivational messages for consistency
-    CONSISTENCY_MESSAGES = [
+    CONSISTENCY_MESSAGES = (
         "Отлично! Регулярность — ключ к пониманию своих паттернов.",
         "Здорово, что продолжаешь отслеживать эмоции!",
         "Каждая запись приближает к лучшему пониманию себя.",
         "Ты делаешь важную работу по самопознанию!"
-    ]
+    )
     
     # Gentle reminders for missed check-ins
-    GENTLE_REMINDERS = [
+    GENTLE_REMINDERS = (
         "Давно не слышал от тебя. Как дела?",
         "Проверяю связь — как настроение сегодня?", 
         "Просто интересуюсь — как ты?"
-    ]
+    )
     
-    # Privacy and data handling
-    PRIVACY_NOTICE = """
-🔒 <b>О приватности данных:</b>
-
-• Данные хранятся локально на сервере бота
-• Никто кроме тебя не имеет к ним доступа
-• Можешь экспортировать всё в CSV: /export
-• Можешь удалить всё: /delete_me
-• Бот не даёт медицинских рекомендаций
-• При серьёзных проблемах обратись к специалисту
-    """
 
-    # NEW: Period formatting helpers
-    PERIOD_NAMES = {
-        7: "неделю",
-        14: "2 недели", 
-        30: "месяц",
-        90: "3 месяца"
-    }
-    
-    # NEW: Button texts
-    BUTTON_TEXTS = {
-        'summary_7_days': "7 дней",
-        'summary_14_days': "2 недели", 
-        'summary_30_days': "30 дней",
-        'summary_90_days': "3 месяца",
-        'summary_custom': "Другой период",
-        'another_period': "Другой период",
-        'export_csv': "📥 Экспорт CSV",
-        'settings_close': "💾 Сохранить и закрыть",
-        'back_to_settings': "← Назад к настройкам"
-    }
+_TRAILING_WS_RE = re.compile(r'[ \t]+\n')
+_EXTRA_BLANK_RE = re.compile(r'\n{3,}')
+
+
+def _minify_html(text: str) -> str:
+    """Collapse whitespace noise so outbound HTML payloads carry no dead bytes."""
+    return _EXTRA_BLANK_RE.sub('\n\n', _TRAILING_WS_RE.sub('\n', text.strip()))
+
+
+# Минифицируем тексты один раз при загрузке: меньше байт в каждом исходящем
+# сообщении и никаких .strip() на горячем пути отправки
+for _name, _value in list(vars(Texts).items()):
+    if _name.isupper() and isinstance(_value, str):
+        setattr(Texts, _name, _minify_html(_value))
+del _name, _value
+
+# Пространство имён common нужно почти каждому обработчику — грузим при импорте
+Texts._install_namespace('common')
+
+# Готовая строка заголовка CSV: в заголовках нет запятых и кавычек, поэтому
+# экранирование csv.writer для неё не нужно — пишем напрямую один раз за экспорт
+CSV_HEADER_LINE = ",".join(Texts.CSV_HEADERS) + "\r\n"
+
+# Интернируем слова эмоций: дубли между категориями ('восхищение' в joy и
+# interest) делят один объект, а хэш/равенство сводятся к сравнению указателей
+Texts.EMOTION_CATEGORIES = MappingProxyType({
+    category: MappingProxyType({
+        'name': data['name'],
+        'emotions': tuple(map(sys.intern, data['emotions'])),
+    })
+    for category, data in Texts.EMOTION_CATEGORIES.items()
+})
+
+# Плоская SoA-раскладка словаря: два параллельных кортежа в одном порядке.
+# Линейные проходы по всем словам идут по ним, без вложенных dict-обходов
+_ALL_EMOTIONS, _ALL_CATEGORIES = zip(*(
+    (word, category)
+    for category, data in Texts.EMOTION_CATEGORIES.items()
+    for word in data['emotions']
+))
+
+# Обратный индекс эмоция -> категория: строится один раз при импорте,
+# чтобы generate_insight делал O(1)-поиск вместо подстрочных сканов
+_EMOTION_TO_CATEGORY = dict(zip(_ALL_EMOTIONS, _ALL_CATEGORIES))
+
+# Прекомпилированные сканеры триггеров: основы слов покрывают падежи
+# ('работой', 'друзьями'), а проход по тексту делает движок re, не Python-цикл
+_WORK_RE = re.compile(r'работ|офис|совещан|начальник')
+_SOCIAL_RE = re.compile(r'люд|друз|семь')
+
+# Таблица правил инсайтов: (категории, диапазон часов, паттерн триггеров, ключ шаблона).
+# None означает "не проверять". Правила обходятся по порядку, первое совпадение побеждает.
+_INSIGHT_RULES = (
+    ({'anxiety'}, range(6, 12), None, 'morning_anxiety'),
+    ({'anxiety'}, range(16, 20), _WORK_RE, 'work_stress_evening'),
+    ({'fatigue'}, range(18, 23), None, 'evening_fatigue'),
+    ({'joy'}, None, None, 'weekend_joy'),
+    (None, None, _SOCIAL_RE, 'social_energy'),
+)
+
+
+# Варианты вопроса об эмоциях: кортеж собирается один раз при импорте
+_EMOTION_PROMPTS = (
+    "Как ты сейчас?",
+    "Что происходит внутри?",
+    "Какое у тебя настроение?",
+    "Как дела с эмоциями?",
+    "Что чувствуешь прямо сейчас?"
+)
+
+
+# Собственный генератор: не делит состояние (и блокировку) с модульным random
+_rng = random.Random()
 
 
 def get_random_emotion_prompt():
     """Get random emotion prompt for variety"""
-    import random
-    
-    prompts = [
-        "Как ты сейчас?",
-        "Что происходит внутри?", 
-        "Какое у тебя настроение?",
-        "Как дела с эмоциями?",
-        "Что чувствуешь прямо сейчас?"
-    ]
-    
-    return random.choice(prompts)
+    return _rng.choice(_EMOTION_PROMPTS)
 
 
 def get_random_context_prompt():
     """Get random context prompt based on cognitive appraisal theory"""
-    import random
-    
-    texts = Texts()
-    return random.choice(texts.CONTEXT_PROMPTS)
+    # Атрибуты классовые - экземпляр Texts() на каждый вызов не нужен
+    return _rng.choice(Texts.CONTEXT_PROMPTS)
 
 
 def get_emotion_by_category(category: str):
     """Get emotions list for specific category"""
-    texts = Texts()
-    return texts.EMOTION_CATEGORIES.get(category, {}).get('emotions', [])
+    return Texts.EMOTION_CATEGORIES.get(category, {}).get('emotions', [])
 
 
-def format_emotion_list(emotions: list, max_length: int = 100):
-    """Format emotion list for display with length limit"""
-    if not emotions:
-        return "нет данных"
-    
-    # Sort by frequency if tuple, otherwise alphabetically
-    if emotions and isinstance(emotions[0], tuple):
-        sorted_emotions = sorted(emotions, key=lambda x: x[1], reverse=True)
-        formatted = ", ".join([f"{emotion} ({count})" for emotion, count in sorted_emotions[:5]])
-    else:
-        sorted_emotions = sorted(emotions)[:5]  
-        formatted = ", ".join(sorted_emotions)
-    
+# Один скомпилированный автомат по всем ~80 словам эмоций: проход по тексту
+# делается движком re за один раз вместо ~80 подстрочных поисков на сообщение.
+# Более длинные слова идут в альтернации первыми, чтобы не обрезать совпадение.
+_EMOTION_WORDS_RE = re.compile(
+    r'\b(' + '|'.join(
+        re.escape(word) for word in sorted(_EMOTION_TO_CATEGORY, key=len, reverse=True)
+    ) + r')\b'
+)
+
+
+def __getattr__(name):
+    """PEP 562: отдаём константы и на уровне модуля.
+
+    `from app.i18n import ONBOARDING` работает наравне с `Texts.ONBOARDING`
+    и проходит через тот же ленивый загрузчик пространств имён.
+    """
+    if name.isupper():
+        return getattr(Texts, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def tag_emotions(text: str):
+    """Find known emotion words in free-form text.
+
+    Returns a list of (word, category) pairs in order of appearance.
+    """
+    if not text:
+        return []
+    return [
+        (match, _EMOTION_TO_CATEGORY[match])
+        for match in _EMOTION_WORDS_RE.findall(text.lower())
+    ]
+
+
+def _truncate(formatted: str, max_length: int) -> str:
+    # Один символ многоточия вместо "..." и одна аллокация через f-строку
     if len(formatted) > max_length:
-        formatted = formatted[:max_length-3] + "..."
-    
+        return f"{formatted[:max_length-1]}…"
     return formatted
 
 
+def format_emotion_counts(pairs: list, max_length: int = 100):
+    """Format (emotion, count) pairs sorted by frequency, top-5"""
+    if not pairs:
+        return "нет данных"
+    # nlargest — O(N log 5) вместо полной сортировки
+    top_emotions = nlargest(5, pairs, key=itemgetter(1))
+    return _truncate(", ".join([f"{emotion} ({count})" for emotion, count in top_emotions]), max_length)
+
+
+def format_emotion_names(names: list, max_length: int = 100):
+    """Format plain emotion names alphabetically, top-5"""
+    if not names:
+        return "нет данных"
+    return _truncate(", ".join(nsmallest(5, names)), max_length)
+
+
+def format_emotion_list(emotions: list, max_length: int = 100):
+    """Format emotion list for display with length limit.
+
+    Shim над типизированными вариантами: новые вызовы должны выбирать
+    format_emotion_counts/format_emotion_names напрямую.
+    """
+    if emotions and isinstance(emotions[0], tuple):
+        return format_emotion_counts(emotions, max_length)
+    return format_emotion_names(emotions, max_length)
+
+
+# Таблица "час -> период суток": прямое индексирование вместо цепочки сравнений
+_HOUR_PERIOD = tuple(
+    "ночью" if h < 6 or h >= 23 else "утром" if h < 12 else "днём" if h < 18 else "вечером"
+    for h in range(24)
+)
+
+
 def get_time_period_text(hour: int):
     """Get human-readable time period"""
-    if 6 <= hour < 12:
-        return "утром"
-    elif 12 <= hour < 18:
-        return "днём"  
-    elif 18 <= hour < 23:
-        return "вечером"
-    else:
-        return "ночью"
+    return _HOUR_PERIOD[hour]
 
 
+@lru_cache(maxsize=128)
 def get_period_name(days: int) -> str:
     """Get human-readable period name"""
-    texts = Texts()
-    return texts.PERIOD_NAMES.get(days, f"{days} дней")
+    return Texts.PERIOD_NAMES.get(days, f"{days} дней")
+
+
+# Прекомпилированные шаблоны: string.Template подставляет значения без разбора
+# format-спецификации на каждый рендер. Атрибуты Texts остаются в {}-стиле;
+# компиляция идёт при первом рендере, чтобы не тянуть namespace summary при импорте.
+@lru_cache(maxsize=None)
+def _compiled_template(attr: str) -> Template:
+    return Template(re.sub(r'\{(\w+)\}', r'${\1}', getattr(Texts, attr)))
+
+
+def render_weekly_summary(**kwargs) -> str:
+    """Render the legacy weekly summary template"""
+    return _compiled_template('WEEKLY_SUMMARY_TEMPLATE').substitute(kwargs)
+
+
+def render_stats(**kwargs) -> str:
+    """Render the bot statistics template"""
+    return _compiled_template('STATS_TEMPLATE').substitute(kwargs)
+
+
+# Готовые строки часов "00".."23": дешевле, чем format-спецификация :02d
+HOUR_STRS = tuple(f"{h:02d}" for h in range(24))
 
 
+@lru_cache(maxsize=None)
+def _settings_parts():
+    """Split SETTINGS_MAIN around its placeholders once (lazy: namespace settings)."""
+    head, rest = Texts.SETTINGS_MAIN.split('{weekly_status}')
+    mid, tail = rest.split('{hour:02d}')
+    return head, mid, tail
+
+
+@lru_cache(maxsize=64)
 def format_settings_text(weekly_enabled: bool, summary_hour: int) -> str:
-    """Format settings display text"""
-    texts = Texts()
-    weekly_status = texts.SETTINGS_WEEKLY_ENABLED if weekly_enabled else texts.SETTINGS_WEEKLY_DISABLED
-    
-    return texts.SETTINGS_MAIN.format(
-        weekly_status=weekly_status,
-        hour=summary_hour
-    )
+    """Format settings display text (домен всего 2x24 — кэшируем готовые строки)"""
+    weekly_status = Texts.SETTINGS_WEEKLY_ENABLED if weekly_enabled else Texts.SETTINGS_WEEKLY_DISABLED
+    head, mid, tail = _settings_parts()
+    return f"{head}{weekly_status}{mid}{HOUR_STRS[summary_hour]}{tail}"
 
 
 def generate_insight(top_emotions: list, top_triggers: list, peak_hour: int):
     """Generate contextual insight based on patterns"""
-    texts = Texts()
-    
     # Convert to simple lists if tuples
     if top_emotions and isinstance(top_emotions[0], tuple):
         emotions = [e[0] for e in top_emotions[:3]]
@@ -520,46 +542,17 @@ def generate_insight(top_emotions: list, top_triggers: list, peak_hour: int):
     else:
         triggers = top_triggers[:3] if top_triggers else []
     
-    # Pattern matching for insights
-    if any('тревога' in e or 'беспокойство' in e for e in emotions):
-        if 6 <= peak_hour < 12:
-            return texts.INSIGHT_TEMPLATES['morning_anxiety']
-        elif any('работа' in t for t in triggers) and 16 <= peak_hour < 20:
-            return texts.INSIGHT_TEMPLATES['work_stress_evening']
-    
-    if any('усталость' in e or 'истощение' in e for e in emotions):
-        if 18 <= peak_hour < 23:
-            return texts.INSIGHT_TEMPLATES['evening_fatigue']
-    
-    if any('радость' in e or 'счастье' in e for e in emotions):
-        # Check if weekend pattern exists (simplified)
-        return texts.INSIGHT_TEMPLATES['weekend_joy']
-    
-    if any('люди' in t or 'друзья' in t or 'семья' in t for t in triggers):
-        return texts.INSIGHT_TEMPLATES['social_energy']
-    
-    return ""  # No specific insight
+    # Pattern matching for insights: один проход по таблице правил
+    categories = {_EMOTION_TO_CATEGORY.get(e.lower()) for e in emotions}
+    trigger_text = ' '.join(t.lower() for t in triggers)
 
+    for rule_cats, hours, pattern, template_key in _INSIGHT_RULES:
+        if rule_cats is not None and not (rule_cats & categories):
+            continue
+        if hours is not None and peak_hour not in hours:
+            continue
+        if pattern is not None and not pattern.search(trigger_text):
+            continue
+        return Texts.INSIGHT_TEMPLATES[template_key]
 
-if __name__ == "__main__":
-    # Test some functions
-    texts = Texts()
-    
-    print("Emotion categories:")
-    for category, data in texts.EMOTION_CATEGORIES.items():
-        print(f"- {data['name']}: {len(data['emotions'])} emotions")
-    
-    print(f"\nRandom emotion prompt: {get_random_emotion_prompt()}")
-    print(f"Random context prompt: {get_random_context_prompt()}")
-    
-    # Test formatting
-    test_emotions = [("радость", 5), ("тревога", 3), ("усталость", 2)]
-    print(f"Formatted emotions: {format_emotion_list(test_emotions)}")
-    
-    # Test period names
-    for days in [7, 14, 30, 90, 45]:
-        print(f"{days} days -> {get_period_name(days)}")
-    
-    # Test settings formatting
-    print(f"\nSettings text: {format_settings_text(True, 21)}")
-    print(f"Settings text (disabled): {format_settings_text(False, 20)}")
+    return ""  # No specific insight
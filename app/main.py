@@ -7,22 +7,32 @@ FIXED: Enhanced webhook handling with detailed logging and proper setup
 import logging
 import os
 import asyncio
-import json
 import time
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from collections import defaultdict
 
+import orjson
+
+# uvloop (libuv) заметно ускоряет socket-нагрузку aiohttp; политика
+# должна быть установлена до создания event loop, поэтому здесь,
+# а не внутри main(). Зависимость опциональная.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, Bot, BotCommand
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, ContextTypes, filters
 from telegram.error import TelegramError
 
 from .db import Database, User, Entry
 from .scheduler import FixedScheduler
-from .i18n import Texts
+from .i18n import Texts, HOUR_STRS
 from .analysis import WeeklyAnalyzer
 from .security import sanitize_user_input, InputValidator
-from .rate_limiter import check_user_limits, command_rate_limiter
+from .rate_limiter import check_user_limits, command_rate_limiter, outbound_limiter
 
 # Configure logging
 logging.basicConfig(
@@ -36,64 +46,96 @@ logging.getLogger("telegram").setLevel(logging.DEBUG)
 logging.getLogger("httpx").setLevel(logging.INFO)
 logging.getLogger("aiohttp").setLevel(logging.INFO)
 
+# --- Статические объекты Telegram API, собираемые один раз при импорте ---
+# Команды, клавиатуры категорий и эмоций не меняются между запросами,
+# поэтому горячие обработчики ссылаются на уже созданные объекты вместо
+# пересборки списков на каждый вызов.
+
+BOT_COMMANDS = (
+    BotCommand("start", "🎭 Запустить бота"),
+    BotCommand("note", "📝 Записать эмоцию сейчас"),
+    BotCommand("help", "❓ Помощь и информация"),
+    BotCommand("summary", "📊 Сводка за период"),
+    BotCommand("settings", "⚙️ Настройки бота"),
+    BotCommand("export", "📥 Экспорт данных в CSV"),
+    BotCommand("timezone", "🌍 Настройка часового пояса"),
+    BotCommand("pause", "⏸️ Приостановить уведомления"),
+    BotCommand("resume", "▶️ Возобновить уведомления"),
+    BotCommand("stats", "📈 Статистика бота"),
+    BotCommand("delete_me", "🗑️ Удалить все данные"),
+)
+
+EMOTIONS_MAP = {
+    "joy": ("радость", "счастье", "восторг", "удовлетворение", "благодарность", "вдохновение"),
+    "interest": ("интерес", "любопытство", "увлечённость", "восхищение", "предвкушение"),
+    "calm": ("спокойствие", "умиротворение", "расслабленность", "безмятежность", "принятие"),
+    "anxiety": ("тревога", "беспокойство", "нервозность", "волнение", "напряжение", "страх"),
+    "sadness": ("грусть", "печаль", "тоска", "уныние", "разочарование", "сожаление"),
+    "anger": ("злость", "раздражение", "гнев", "возмущение", "обида", "фрустрация"),
+    "shame": ("стыд", "вина", "смущение", "неловкость", "сожаление", "самокритика"),
+    "fatigue": ("усталость", "истощение", "вялость", "апатия", "безразличие", "выгорание"),
+}
+
+CATEGORIES_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton(name, callback_data=callback)]
+    for name, callback in (
+        ("Радость/Удовлетворение", "category_joy"),
+        ("Интерес/Любопытство", "category_interest"),
+        ("Спокойствие/Умиротворение", "category_calm"),
+        ("Тревога/Беспокойство", "category_anxiety"),
+        ("Грусть/Печаль", "category_sadness"),
+        ("Злость/Раздражение", "category_anger"),
+        ("Стыд/Вина", "category_shame"),
+        ("Усталость/Истощение", "category_fatigue"),
+        ("Другое", "other_emotion"),
+    )
+])
+
+CATEGORY_EMOTION_MARKUPS = {
+    category: InlineKeyboardMarkup(
+        [[InlineKeyboardButton(emotion.title(), callback_data=f"emotion_{emotion}")]
+         for emotion in emotions]
+        + [[InlineKeyboardButton("← Назад к категориям", callback_data="show_emotions")],
+           [InlineKeyboardButton("Другое, напишу сам(а)", callback_data="other_emotion")]]
+    )
+    for category, emotions in EMOTIONS_MAP.items()
+}
+
+
 class UserStateManager:
-    """Простое управление состояниями пользователей с автоочисткой"""
-    
-    def __init__(self, cleanup_interval: int = 3600):  # 1 час
+    """Простое управление состояниями пользователей с ленивым истечением"""
+
+    def __init__(self, ttl_seconds: int = 1800):  # 30 минут
         self.states: Dict[int, Dict[str, Any]] = {}
-        self.cleanup_interval = cleanup_interval
-        self.last_cleanup = time.time()
-    
+        self.ttl_seconds = ttl_seconds
+
     def set_state(self, user_id: int, state: str, data: Dict[str, Any] = None):
         """Установить состояние пользователя"""
-        self._cleanup_if_needed()
-        
-        if user_id not in self.states:
-            self.states[user_id] = {}
-        
-        self.states[user_id].update({
+        # Срок годности хранится прямо в записи: просроченные записи
+        # перезаписываются при следующей вставке, фоновая очистка не нужна
+        self.states[user_id] = {
             'state': state,
-            'timestamp': time.time(),
+            # Монотонные часы: метки сравниваются только между собой
+            '_exp': time.monotonic() + self.ttl_seconds,
             **(data or {})
-        })
-    
+        }
+
     def get_state(self, user_id: int) -> Dict[str, Any]:
-        """Получить состояние пользователя"""
-        self._cleanup_if_needed()
-        
-        user_state = self.states.get(user_id, {})
-        
-        # Проверить не устарело ли состояние (24 часа)
-        if user_state.get('timestamp', 0) < time.time() - 86400:
-            self.clear_state(user_id)
+        """Получить состояние пользователя (просроченное считается отсутствующим)"""
+        user_state = self.states.get(user_id)
+        if user_state is None:
             return {}
-        
+
+        if time.monotonic() > user_state['_exp']:
+            del self.states[user_id]
+            return {}
+
         return user_state
-    
+
     def clear_state(self, user_id: int):
         """Очистить состояние пользователя"""
         if user_id in self.states:
             del self.states[user_id]
-    
-    def _cleanup_if_needed(self):
-        """Периодическая очистка устаревших состояний"""
-        now = time.time()
-        if now - self.last_cleanup < self.cleanup_interval:
-            return
-        
-        cutoff_time = now - 86400  # 24 часа
-        expired_users = [
-            user_id for user_id, state in self.states.items()
-            if state.get('timestamp', 0) < cutoff_time
-        ]
-        
-        for user_id in expired_users:
-            del self.states[user_id]
-        
-        self.last_cleanup = now
-        
-        if expired_users:
-            logger.info(f"Cleaned up {len(expired_users)} expired user states")
 
 
 class EmoJournalBot:
@@ -118,6 +160,16 @@ class EmoJournalBot:
         # Безопасное управление состояниями
         self.user_state_manager = UserStateManager()
         
+        # Очередь записей в БД: обработчики кладут и сразу отвечают,
+        # фоновый воркер пишет на диск вне event loop
+        self._write_q: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+        self._db_writer_task: Optional[asyncio.Task] = None
+        
+        # Очередь входящих апдейтов: webhook отвечает 200 сразу,
+        # пул воркеров обрабатывает апдейты независимо от ingress
+        self._upd_q: asyncio.Queue = asyncio.Queue(maxsize=5000)
+        self._upd_workers: list = []
+        
         # Environment validation
         self.bot_token = self._get_env_var('TELEGRAM_BOT_TOKEN')
         self.webhook_url = self._get_env_var('WEBHOOK_URL')
@@ -133,6 +185,15 @@ class EmoJournalBot:
             raise ValueError(f"Environment variable {name} is required")
         return value
     
+    async def _send(self, chat_id: int, coro):
+        """Исходящий вызов Bot API с учётом лимитов Telegram"""
+        await outbound_limiter.acquire(chat_id)
+        return await coro
+    
+    async def _db(self, fn, *args, **kwargs):
+        """Run a blocking Database call in a worker thread, off the event loop"""
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    
     def _set_user_state(self, user_id: int, state: str, data: Dict[str, Any] = None):
         """Set user conversation state"""
         self.user_state_manager.set_state(user_id, state, data)
@@ -176,9 +237,9 @@ class EmoJournalBot:
         
         try:
             # Create or get user
-            user = self.db.get_user(user_id)
+            user = await self._db(self.db.get_user, user_id)
             if not user:
-                user = self.db.create_user(user_id, chat_id)
+                user = await self._db(self.db.create_user, user_id, chat_id)
                 logger.info(f"Created new user {user_id}")
                 
                 # Запускаем scheduler для нового пользователя
@@ -197,27 +258,6 @@ class EmoJournalBot:
                 except Exception as e:
                     logger.error(f"Failed to restart scheduling for user {user_id}: {e}")
             
-            # Set bot commands menu (только один раз)
-            if not hasattr(self, '_commands_set'):
-                commands = [
-                    BotCommand("start", "🎭 Запустить бота"),
-                    BotCommand("note", "📝 Записать эмоцию сейчас"),
-                    BotCommand("help", "❓ Помощь и информация"),
-                    BotCommand("summary", "📊 Сводка за период"),
-                    BotCommand("settings", "⚙️ Настройки бота"),
-                    BotCommand("export", "📥 Экспорт данных в CSV"),
-                    BotCommand("timezone", "🌍 Настройка часового пояса"),
-                    BotCommand("pause", "⏸️ Приостановить уведомления"),
-                    BotCommand("resume", "▶️ Возобновить уведомления"),
-                    BotCommand("stats", "📈 Статистика бота"),
-                    BotCommand("delete_me", "🗑️ Удалить все данные")
-                ]
-                
-                # Устанавливаем команды асинхронно
-                asyncio.create_task(context.bot.set_my_commands(commands))
-                self._commands_set = True
-                logger.info("Set bot commands menu")
-            
             # Моментальный ответ пользователю
             await update.message.reply_text(
                 self.texts.ONBOARDING,
@@ -286,7 +326,7 @@ class EmoJournalBot:
             try:
                 import zoneinfo
                 zoneinfo.ZoneInfo(tz_validated)  # Validate timezone
-                self.db.update_user_timezone(user_id, tz_validated)
+                await self._db(self.db.update_user_timezone, user_id, tz_validated)
                 await update.message.reply_text(
                     f"Часовой пояс установлен: {tz_validated}"
                 )
@@ -301,7 +341,7 @@ class EmoJournalBot:
                     "Неверный часовой пояс. Используйте формат IANA, например: Europe/Moscow, Asia/Yekaterinburg"
                 )
         else:
-            user = self.db.get_user(user_id)
+            user = await self._db(self.db.get_user, user_id)
             current_tz = user.timezone if user else "Europe/Moscow"
             await update.message.reply_text(
                 f"Текущий часовой пояс: {current_tz}\n\n"
@@ -348,14 +388,14 @@ class EmoJournalBot:
         
         try:
             # Get current settings
-            settings = self.db.get_user_settings(user_id)
+            settings = await self._db(self.db.get_user_settings, user_id)
             if not settings:
                 # Create default settings if not exist
-                self.db.update_user_settings(user_id, 
+                await self._db(self.db.update_user_settings, user_id, 
                     weekly_summary_enabled=True, 
                     summary_time_hour=21
                 )
-                settings = self.db.get_user_settings(user_id)
+                settings = await self._db(self.db.get_user_settings, user_id)
             
             weekly_enabled = settings.get('weekly_summary_enabled', True)
             summary_hour = settings.get('summary_time_hour', 21)
@@ -365,7 +405,7 @@ class EmoJournalBot:
             keyboard = [
                 [InlineKeyboardButton(f"Еженедельные саммари: {weekly_text}", 
                                     callback_data="toggle_weekly_summary")],
-                [InlineKeyboardButton(f"Время отправки: {summary_hour:02d}:00", 
+                [InlineKeyboardButton(f"Время отправки: {HOUR_STRS[summary_hour]}:00", 
                                     callback_data="change_summary_time")],
                 [InlineKeyboardButton("💾 Сохранить и закрыть", 
                                     callback_data="settings_close")]
@@ -375,7 +415,7 @@ class EmoJournalBot:
             await update.message.reply_text(
                 "⚙️ <b>Настройки EmoJournal</b>\n\n"
                 f"📅 <b>Автоматические саммари:</b> {weekly_text}\n"
-                f"🕘 <b>Время отправки:</b> каждое воскресенье в {summary_hour:02d}:00\n\n"
+                f"🕘 <b>Время отправки:</b> каждое воскресенье в {HOUR_STRS[summary_hour]}:00\n\n"
                 "Выберите что хотите изменить:",
                 reply_markup=reply_markup,
                 parse_mode='HTML'
@@ -446,7 +486,7 @@ class EmoJournalBot:
         logger.info(f"Received /pause from user {user_id}")
         
         try:
-            self.db.update_user_paused(user_id, True)
+            await self._db(self.db.update_user_paused, user_id, True)
             try:
                 await self.scheduler.stop_user_schedule(user_id)
             except Exception as e:
@@ -466,7 +506,7 @@ class EmoJournalBot:
         logger.info(f"Received /resume from user {user_id}")
         
         try:
-            self.db.update_user_paused(user_id, False)
+            await self._db(self.db.update_user_paused, user_id, False)
             try:
                 await self.scheduler.start_user_schedule(user_id)
             except Exception as e:
@@ -486,7 +526,7 @@ class EmoJournalBot:
         logger.info(f"Received /stats from user {user_id}")
         
         try:
-            stats = self.db.get_global_stats()
+            stats = await self._db(self.db.get_global_stats)
             await update.message.reply_text(
                 f"📊 Статистика EmoJournal:\n\n"
                 f"👥 Всего пользователей: {stats['total_users']}\n"
@@ -515,12 +555,12 @@ class EmoJournalBot:
 
 <i>Сам факт, что ты это заметишь и назовёшь, — уже шаг к ясности.</i>"""
             
-            await self.bot.send_message(
+            await self._send(chat_id, self.bot.send_message(
                 chat_id=chat_id,
                 text=ping_text,
                 reply_markup=reply_markup,
                 parse_mode='HTML'
-            )
+            ))
             
             logger.info(f"Sent emotion ping to user {user_id}")
             return True
@@ -680,12 +720,12 @@ class EmoJournalBot:
         """Toggle weekly summary setting"""
         try:
             # Get current settings
-            settings = self.db.get_user_settings(user_id)
+            settings = await self._db(self.db.get_user_settings, user_id)
             current_enabled = settings.get('weekly_summary_enabled', True) if settings else True
             
             # Toggle setting
             new_enabled = not current_enabled
-            self.db.update_user_settings(user_id, weekly_summary_enabled=new_enabled)
+            await self._db(self.db.update_user_settings, user_id, weekly_summary_enabled=new_enabled)
             
             # Update display
             await self._refresh_settings_display(query, user_id)
@@ -706,7 +746,7 @@ class EmoJournalBot:
                 if i + j < len(time_options):
                     hour = time_options[i + j]
                     row.append(InlineKeyboardButton(
-                        f"{hour:02d}:00", 
+                        f"{HOUR_STRS[hour]}:00", 
                         callback_data=f"time_hour_{hour}"
                     ))
             keyboard.append(row)
@@ -732,7 +772,7 @@ class EmoJournalBot:
                 return
             
             # Update setting
-            self.db.update_user_settings(user_id, summary_time_hour=hour)
+            await self._db(self.db.update_user_settings, user_id, summary_time_hour=hour)
             
             # Back to settings
             await self._refresh_settings_display(query, user_id)
@@ -744,7 +784,7 @@ class EmoJournalBot:
     async def _refresh_settings_display(self, query, user_id: int):
         """Refresh settings display with current values"""
         try:
-            settings = self.db.get_user_settings(user_id)
+            settings = await self._db(self.db.get_user_settings, user_id)
             weekly_enabled = settings.get('weekly_summary_enabled', True) if settings else True
             summary_hour = settings.get('summary_time_hour', 21) if settings else 21
             
@@ -752,7 +792,7 @@ class EmoJournalBot:
             keyboard = [
                 [InlineKeyboardButton(f"Еженедельные саммари: {weekly_text}", 
                                     callback_data="toggle_weekly_summary")],
-                [InlineKeyboardButton(f"Время отправки: {summary_hour:02d}:00", 
+                [InlineKeyboardButton(f"Время отправки: {HOUR_STRS[summary_hour]}:00", 
                                     callback_data="change_summary_time")],
                 [InlineKeyboardButton("💾 Сохранить и закрыть", 
                                     callback_data="settings_close")]
@@ -762,7 +802,7 @@ class EmoJournalBot:
             await query.edit_message_text(
                 "⚙️ <b>Настройки EmoJournal</b>\n\n"
                 f"📅 <b>Автоматические саммари:</b> {weekly_text}\n"
-                f"🕘 <b>Время отправки:</b> каждое воскресенье в {summary_hour:02d}:00\n\n"
+                f"🕘 <b>Время отправки:</b> каждое воскресенье в {HOUR_STRS[summary_hour]}:00\n\n"
                 "Выберите что хотите изменить:",
                 reply_markup=reply_markup,
                 parse_mode='HTML'
@@ -802,56 +842,22 @@ class EmoJournalBot:
     
     async def _show_emotion_categories(self, query):
         """Show emotion categories"""
-        keyboard = []
-        categories = [
-            ("Радость/Удовлетворение", "category_joy"),
-            ("Интерес/Любопытство", "category_interest"),
-            ("Спокойствие/Умиротворение", "category_calm"),
-            ("Тревога/Беспокойство", "category_anxiety"),
-            ("Грусть/Печаль", "category_sadness"),
-            ("Злость/Раздражение", "category_anger"),
-            ("Стыд/Вина", "category_shame"),
-            ("Усталость/Истощение", "category_fatigue"),
-            ("Другое", "other_emotion")
-        ]
-        
-        for name, callback in categories:
-            keyboard.append([InlineKeyboardButton(name, callback_data=callback)])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await query.edit_message_text(
             "Выбери группу эмоций, которая ближе всего:",
-            reply_markup=reply_markup
+            reply_markup=CATEGORIES_MARKUP
         )
     
     async def _show_category_emotions(self, query, data: str):
         """Show specific emotions in category"""
         category = data.replace("category_", "")
+        markup = CATEGORY_EMOTION_MARKUPS.get(category)
+        if markup is None:
+            await self._show_emotion_categories(query)
+            return
         
-        emotions_map = {
-            "joy": ["радость", "счастье", "восторг", "удовлетворение", "благодарность", "вдохновение"],
-            "interest": ["интерес", "любопытство", "увлечённость", "восхищение", "предвкушение"],
-            "calm": ["спокойствие", "умиротворение", "расслабленность", "безмятежность", "принятие"],
-            "anxiety": ["тревога", "беспокойство", "нервозность", "волнение", "напряжение", "страх"],
-            "sadness": ["грусть", "печаль", "тоска", "уныние", "разочарование", "сожаление"],
-            "anger": ["злость", "раздражение", "гнев", "возмущение", "обида", "фрустрация"],
-            "shame": ["стыд", "вина", "смущение", "неловкость", "сожаление", "самокритика"],
-            "fatigue": ["усталость", "истощение", "вялость", "апатия", "безразличие", "выгорание"]
-        }
-        
-        emotions = emotions_map.get(category, [])
-        keyboard = []
-        
-        for emotion in emotions:
-            keyboard.append([InlineKeyboardButton(emotion.title(), callback_data=f"emotion_{emotion}")])
-        
-        keyboard.append([InlineKeyboardButton("← Назад к категориям", callback_data="show_emotions")])
-        keyboard.append([InlineKeyboardButton("Другое, напишу сам(а)", callback_data="other_emotion")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await query.edit_message_text(
             "Выбери конкретную эмоцию:",
-            reply_markup=reply_markup
+            reply_markup=markup
         )
     
     async def _handle_emotion_selection(self, query, data: str):
@@ -929,7 +935,7 @@ class EmoJournalBot:
     async def _confirm_delete(self, query, user_id: int):
         """Confirm user data deletion"""
         try:
-            self.db.delete_user_data(user_id)
+            await self._db(self.db.delete_user_data, user_id)
             try:
                 await self.scheduler.stop_user_schedule(user_id)
             except Exception as e:
@@ -1068,48 +1074,73 @@ class EmoJournalBot:
             )
     
     async def _save_emotion_entry(self, user_id: int, emotion_text: str, cause_text: str = ''):
-        """Save emotion entry to database with validation"""
+        """Validate entry and enqueue it for the background DB writer"""
+        emotion_validated = sanitize_user_input(emotion_text, "emotion")
+        cause_validated = sanitize_user_input(cause_text, "cause") if cause_text else ""
+        
+        if not emotion_validated:
+            raise ValueError("Invalid emotion text")
+        
+        try:
+            self._write_q.put_nowait((user_id, emotion_validated, cause_validated))
+        except asyncio.QueueFull:
+            # Очередь переполнена — пишем синхронно, чтобы не терять запись
+            logger.warning("DB write queue full, persisting entry inline")
+            await self._persist_entry(user_id, emotion_validated, cause_validated)
+    
+    async def _persist_entry(self, user_id: int, emotion: str, cause: str):
+        """Save a validated emotion entry, running blocking DB calls off-loop"""
         try:
             # Ensure user exists (auto-create if needed)
-            user = self.db.get_user(user_id)
+            user = await asyncio.to_thread(self.db.get_user, user_id)
             if not user:
-                user = self.db.create_user(user_id, user_id)  # Use user_id as chat_id
+                await asyncio.to_thread(self.db.create_user, user_id, user_id)  # Use user_id as chat_id
                 try:
                     await self.scheduler.start_user_schedule(user_id)
                 except Exception as e:
                     logger.error(f"Error starting schedule for new user {user_id}: {e}")
                 logger.info(f"Auto-created user {user_id}")
             
-            # Additional validation
-            emotion_validated = sanitize_user_input(emotion_text, "emotion")
-            cause_validated = sanitize_user_input(cause_text, "cause") if cause_text else ""
-            
-            if not emotion_validated:
-                raise ValueError("Invalid emotion text")
-            
-            entry_data = {
-                'emotions': [emotion_validated.lower()],
-                'cause': cause_validated,
-                'note': f"{emotion_validated}" + (f" (причина: {cause_validated})" if cause_validated else ""),
-                'valence': None,
-                'arousal': None
-            }
-            
-            self.db.create_entry(
+            note = f"{emotion}" + (f" (причина: {cause})" if cause else "")
+            await asyncio.to_thread(
+                self.db.create_entry,
                 user_id=user_id,
-                emotions=json.dumps(entry_data['emotions'], ensure_ascii=False),
-                cause=entry_data['cause'],
-                note=entry_data['note'],
-                valence=entry_data['valence'],
-                arousal=entry_data['arousal']
+                emotions=orjson.dumps([emotion.lower()]).decode(),
+                cause=cause,
+                note=note,
+                valence=None,
+                arousal=None
             )
             
-            logger.info(f"Saved emotion entry for user {user_id}: {emotion_validated}")
+            logger.info(f"Saved emotion entry for user {user_id}: {emotion}")
             
         except Exception as e:
             logger.error(f"Failed to save emotion entry for user {user_id}: {e}")
             raise
     
+    async def _update_worker(self, application):
+        """Воркер пула обработки апдейтов из очереди ingress"""
+        while True:
+            update = await self._upd_q.get()
+            try:
+                await application.process_update(update)
+                logger.info(f"Successfully processed update {update.update_id}")
+            except Exception as e:
+                logger.error(f"Error processing update {update.update_id}: {e}")
+            finally:
+                self._upd_q.task_done()
+    
+    async def _db_writer(self):
+        """Фоновый воркер, сливающий очередь записей в БД"""
+        while True:
+            user_id, emotion, cause = await self._write_q.get()
+            try:
+                await self._persist_entry(user_id, emotion, cause)
+            except Exception as e:
+                logger.error(f"DB writer error for user {user_id}: {e}")
+            finally:
+                self._write_q.task_done()
+    
     def create_application(self):
         """Create and configure telegram application"""
         application = Application.builder().token(self.bot_token).build()
@@ -1150,7 +1181,27 @@ class EmoJournalBot:
         # Initialize application
         await application.initialize()
         await application.start()
-        
+
+        # Меню команд не меняется между деплоями — выставляем один раз
+        # при старте, а не в обработчике /start (лишний сетевой хоп на
+        # каждого нового пользователя)
+        try:
+            await application.bot.set_my_commands(BOT_COMMANDS)
+            logger.info("Set bot commands menu")
+        except Exception as e:
+            logger.warning(f"Could not set bot commands: {e}")
+
+        # Запускаем фонового писателя БД (decouple ingress от записи)
+        self._db_writer_task = asyncio.create_task(self._db_writer())
+        logger.info("Started background DB writer")
+
+        # Пул воркеров обработки апдейтов
+        self._upd_workers = [
+            asyncio.create_task(self._update_worker(application))
+            for _ in range(16)
+        ]
+        logger.info(f"Started {len(self._upd_workers)} update workers")
+
         # ИСПРАВЛЕНИЕ: Принудительно удаляем старый webhook
         try:
             delete_result = await application.bot.delete_webhook()
@@ -1211,10 +1262,11 @@ class EmoJournalBot:
                 logger.info(f"Request URL: {request.url}")
                 logger.info(f"Request headers: {headers}")
                 
-                # Получаем тело запроса
-                body = await request.text()
-                logger.info(f"Webhook body length: {len(body)} chars")
-                logger.info(f"Webhook body preview: {body[:300]}...")
+                # Получаем тело запроса как bytes — orjson парсит их
+                # напрямую, без промежуточного utf-8 декодирования
+                body = await request.read()
+                logger.info(f"Webhook body length: {len(body)} bytes")
+                logger.info(f"Webhook body preview: {body[:300]!r}...")
                 
                 if not body:
                     logger.warning("Empty webhook body received")
@@ -1222,12 +1274,12 @@ class EmoJournalBot:
                 
                 # Парсим JSON
                 try:
-                    update_data = json.loads(body)
+                    update_data = orjson.loads(body)
                     logger.info(f"Parsed JSON successfully. Keys: {list(update_data.keys())}")
                     logger.info(f"Update data: {update_data}")
-                except json.JSONDecodeError as e:
+                except orjson.JSONDecodeError as e:
                     logger.error(f"Failed to parse JSON: {e}")
-                    logger.error(f"Raw body: {body}")
+                    logger.error(f"Raw body: {body!r}")
                     return web.Response(status=400, text="Invalid JSON")
                 
                 # Создаем Update объект
@@ -1252,16 +1304,15 @@ class EmoJournalBot:
                     logger.error(f"Update data was: {update_data}")
                     return web.Response(status=500, text="Update creation failed")
                 
-                # Обрабатываем обновление
+                # Ставим апдейт в очередь и сразу отвечаем: обработка
+                # (БД, ответные вызовы Bot API) идёт в пуле воркеров
                 try:
-                    logger.info(f"Processing update {update.update_id}...")
-                    await application.process_update(update)
-                    logger.info(f"Successfully processed update {update.update_id}")
-                except Exception as e:
-                    logger.error(f"Error processing update {update.update_id}: {e}")
-                    import traceback
-                    logger.error(f"Traceback: {traceback.format_exc()}")
-                    # Не возвращаем ошибку, чтобы Telegram не повторял запрос
+                    self._upd_q.put_nowait(update)
+                    logger.info(f"Queued update {update.update_id}")
+                except asyncio.QueueFull:
+                    # Честный backpressure: Telegram повторит доставку
+                    logger.warning(f"Update queue full, rejecting update {update.update_id}")
+                    return web.Response(status=429, text="Queue full")
                 
                 logger.info(f"=== WEBHOOK REQUEST COMPLETED ===")
                 return web.Response(status=200, text="OK")
@@ -2,8 +2,13 @@
 """
 Rate limiting for EmoJournal Bot
 Protection against spam and abuse
+
+Все метки времени внутренние и сравниваются только между собой, поэтому
+используется time.monotonic(): дешевле time.time() и не зависит от
+переводов системных часов.
 """
 
+import asyncio
 import time
 from collections import defaultdict
 from typing import Dict, List
@@ -25,7 +30,7 @@ class RateLimiter:
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self.requests: Dict[int, List[float]] = defaultdict(list)
-        self.last_cleanup = time.time()
+        self.last_cleanup = time.monotonic()
         self.cleanup_interval = 300  # Очистка каждые 5 минут
     
     def is_allowed(self, user_id: int) -> bool:
@@ -38,7 +43,7 @@ class RateLimiter:
         Returns:
             True если запрос разрешен, False если превышен лимит
         """
-        now = time.time()
+        now = time.monotonic()
         
         # Периодическая очистка старых записей
         self._cleanup_if_needed(now)
@@ -62,7 +67,7 @@ class RateLimiter:
     
     def get_remaining_requests(self, user_id: int) -> int:
         """Получить количество оставшихся запросов"""
-        now = time.time()
+        now = time.monotonic()
         cutoff_time = now - self.window_seconds
         
         user_requests = self.requests.get(user_id, [])
@@ -79,7 +84,7 @@ class RateLimiter:
         oldest_request = min(user_requests)
         reset_time = oldest_request + self.window_seconds
         
-        return max(0, reset_time - time.time())
+        return max(0, reset_time - time.monotonic())
     
     def _cleanup_if_needed(self, now: float):
         """Периодическая очистка устаревших записей"""
@@ -222,7 +227,7 @@ class GlobalRateLimiter:
     
     def is_allowed(self) -> bool:
         """Проверить глобальный лимит"""
-        now = time.time()
+        now = time.monotonic()
         
         # Удалить запросы старше 1 секунды
         self.requests = [req_time for req_time in self.requests if req_time > now - 1.0]
@@ -237,11 +242,92 @@ class GlobalRateLimiter:
         return True
 
 
+
+class TokenBucketLimiter:
+    """Token bucket для исходящих вызовов Telegram API
+    
+    Telegram ограничивает отправку примерно 30 сообщениями в секунду на
+    бота и 1 сообщением в секунду на чат. acquire() ждёт, пока оба
+    бакета (глобальный и чатовый) не выдадут токен, поэтому массовые
+    рассылки сами растягиваются вместо ловли 429.
+    """
+    
+    def __init__(self, global_rate: float = 30.0, per_chat_rate: float = 1.0):
+        """
+        Args:
+            global_rate: Токенов в секунду на всего бота
+            per_chat_rate: Токенов в секунду на один чат
+        """
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self._global_tokens = global_rate
+        self._global_updated = time.monotonic()
+        # chat_id -> [tokens, updated]
+        self._chat_buckets: Dict[int, list] = {}
+        self._lock = asyncio.Lock()
+        self._last_cleanup = time.monotonic()
+    
+    async def acquire(self, chat_id: int = None):
+        """Дождаться токена (глобального и, если задан chat_id, чатового)"""
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                wait = self._refill_and_take(chat_id, now)
+                if wait <= 0:
+                    self._cleanup_if_needed(now)
+                    return
+            await asyncio.sleep(wait)
+    
+    def _refill_and_take(self, chat_id, now: float) -> float:
+        """Пополнить бакеты; вернуть 0 при успехе или время ожидания"""
+        elapsed = now - self._global_updated
+        self._global_tokens = min(self.global_rate, self._global_tokens + elapsed * self.global_rate)
+        self._global_updated = now
+        
+        chat_bucket = None
+        if chat_id is not None:
+            chat_bucket = self._chat_buckets.get(chat_id)
+            if chat_bucket is None:
+                chat_bucket = [self.per_chat_rate, now]
+                self._chat_buckets[chat_id] = chat_bucket
+            else:
+                tokens, updated = chat_bucket
+                chat_bucket[0] = min(self.per_chat_rate, tokens + (now - updated) * self.per_chat_rate)
+                chat_bucket[1] = now
+        
+        wait = 0.0
+        if self._global_tokens < 1.0:
+            wait = (1.0 - self._global_tokens) / self.global_rate
+        if chat_bucket is not None and chat_bucket[0] < 1.0:
+            wait = max(wait, (1.0 - chat_bucket[0]) / self.per_chat_rate)
+        
+        if wait > 0:
+            return wait
+        
+        self._global_tokens -= 1.0
+        if chat_bucket is not None:
+            chat_bucket[0] -= 1.0
+        return 0.0
+    
+    def _cleanup_if_needed(self, now: float):
+        """Лениво выбросить полные (давно не использованные) чатовые бакеты"""
+        if now - self._last_cleanup < 300:
+            return
+        
+        self._chat_buckets = {
+            chat_id: bucket for chat_id, bucket in self._chat_buckets.items()
+            if now - bucket[1] < 60
+        }
+        self._last_cleanup = now
+
+
+
 # Глобальные экземпляры
 user_rate_limiter = RateLimiter(max_requests=20, window_seconds=60)
 command_rate_limiter = CommandRateLimiter()
 anti_spam_filter = AntiSpamFilter()
 global_rate_limiter = GlobalRateLimiter(max_requests_per_second=25)
+outbound_limiter = TokenBucketLimiter()
 
 
 def check_user_limits(user_id: int, message: str = "", command: str = "") -> tuple[bool, str]:
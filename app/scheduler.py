@@ -17,6 +17,8 @@ from apscheduler.executors.asyncio import AsyncIOExecutor
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.events import EVENT_JOB_ERROR, EVENT_JOB_EXECUTED
 
+from .db import User
+
 logger = logging.getLogger(__name__)
 
 class FixedScheduler:
@@ -89,7 +91,25 @@ class FixedScheduler:
                 id='weekly_summaries_checker',
                 replace_existing=True
             )
-            
+
+            # Flush debounced last_activity updates in one batch per minute
+            self.scheduler.add_job(
+                self._flush_activity_safe,
+                'interval',
+                seconds=60,
+                id='activity_flush',
+                replace_existing=True
+            )
+
+            # Refresh SQLite planner statistics daily (PRAGMA optimize)
+            self.scheduler.add_job(
+                self._optimize_db_safe,
+                'interval',
+                hours=24,
+                id='db_optimize',
+                replace_existing=True
+            )
+
             logger.info("Fixed scheduler started successfully with timezone-aware weekly summaries")
             
         except Exception as e:
@@ -125,6 +145,20 @@ class FixedScheduler:
         except Exception as e:
             logger.error(f"Retry ping failed for user {user_id}: {e}")
     
+    async def _flush_activity_safe(self):
+        """Safely flush debounced last_activity updates"""
+        try:
+            self.db.flush_pending_activity()
+        except Exception as e:
+            logger.error(f"Failed to flush activity updates: {e}")
+
+    async def _optimize_db_safe(self):
+        """Safely refresh database planner statistics"""
+        try:
+            self.db.run_pragma_optimize()
+        except Exception as e:
+            logger.error(f"Failed to run PRAGMA optimize: {e}")
+
     async def _check_weekly_summaries_safe(self):
         """Safely check if any users need weekly summaries (runs hourly)"""
         try:
@@ -136,7 +170,7 @@ class FixedScheduler:
         """Check if any users need weekly summaries based on their timezone and settings"""
         try:
             # Get all active users
-            active_users = self.db.get_active_users()
+            active_users = self.db.iter_active_users()
             
             current_utc = datetime.now()
             users_to_send = []
@@ -205,14 +239,18 @@ class FixedScheduler:
     
     async def _send_weekly_summaries_to_users(self, users: list):
         """Send weekly summaries to list of users"""
+        from .i18n import Texts
+
+        # Прогреваем тексты сводок один раз до цикла рассылки
+        Texts.preload(('summary', 'insights'))
+
         success_count = 0
         error_count = 0
         
         for user in users:
             try:
                 # Check if user has entries for the week
-                entries = self.db.get_user_entries(user.id, days=7)
-                if len(entries) == 0:
+                if not self.db.has_any_entries(user.id, days=7):
                     logger.debug(f"No entries for user {user.id}, skipping weekly summary")
                     continue
                 
@@ -260,6 +298,9 @@ class FixedScheduler:
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
+            # Лимиты Telegram: массовая рассылка растягивается сама
+            from .rate_limiter import outbound_limiter
+            await outbound_limiter.acquire(chat_id)
             await self.bot_instance.bot.send_message(
                 chat_id=chat_id,
                 text=auto_summary,
@@ -291,7 +332,7 @@ class FixedScheduler:
             return
         
         try:
-            user = self.db.get_user(user_id)
+            user = self.db.get_user_fields(user_id, User.chat_id, User.timezone, User.paused)
             if not user or user.paused:
                 logger.info(f"User {user_id} is paused or not found, skipping schedule")
                 return
@@ -423,7 +464,7 @@ class FixedScheduler:
     
     async def _generate_user_daily_schedule(self, user_id: int):
         """Generate and schedule pings for a specific user (called daily at 08:55)"""
-        user = self.db.get_user(user_id)
+        user = self.db.get_user_fields(user_id, User.chat_id, User.timezone, User.paused)
         if not user or user.paused:
             return
         
@@ -478,7 +519,7 @@ class FixedScheduler:
     async def _daily_schedule_all_users(self):
         """Generate schedules for all active users (runs daily at 23:55 UTC)"""
         try:
-            active_users = self.db.get_active_users()
+            active_users = self.db.iter_active_users()
         except Exception as e:
             logger.error(f"Failed to get active users: {e}")
             return
@@ -514,7 +555,7 @@ class FixedScheduler:
         
         try:
             # Check if user still exists and is not paused
-            user = self.db.get_user(user_id)
+            user = self.db.get_user_fields(user_id, User.chat_id, User.timezone, User.paused)
             if not user or user.paused:
                 logger.info(f"User {user_id} is paused or not found, skipping ping")
                 return
@@ -572,7 +613,7 @@ class FixedScheduler:
             return
         
         try:
-            user = self.db.get_user(user_id)
+            user = self.db.get_user_fields(user_id, User.chat_id, User.timezone, User.paused)
             if not user:
                 logger.warning(f"User {user_id} not found for skip_today")
                 return
@@ -655,14 +696,13 @@ class FixedScheduler:
     async def send_test_weekly_summary(self, user_id: int):
         """Send a test weekly summary to a specific user (for debugging)"""
         try:
-            user = self.db.get_user(user_id)
+            user = self.db.get_user_fields(user_id, User.chat_id, User.timezone, User.paused)
             if not user:
                 logger.error(f"User {user_id} not found for test summary")
                 return False
             
             # Check if user has entries
-            entries = self.db.get_user_entries(user_id, days=7)
-            if len(entries) == 0:
+            if not self.db.has_any_entries(user_id, days=7):
                 logger.info(f"No entries for user {user_id}, cannot send test summary")
                 return False
             
@@ -677,7 +717,7 @@ class FixedScheduler:
     def get_users_due_for_summary(self) -> list:
         """Get list of users who are due for weekly summary right now"""
         try:
-            active_users = self.db.get_active_users()
+            active_users = self.db.iter_active_users()
             current_utc = datetime.now()
             due_users = []
             
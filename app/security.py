@@ -10,16 +10,26 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Скомпилированные один раз шаблоны: sanitize_user_input зовётся на каждое
+# сообщение, компиляция в горячем пути не нужна
+_WHITESPACE_RE = re.compile(r'\s+')
+_DIGIT_RE = re.compile(r'\d')
+_REPEATED_CHAR_RE = re.compile(r'(.)\1{10,}')
+_EMOJI_RE = re.compile(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]')
+_MULTI_DOT_RE = re.compile(r'[.]{3,}')
+_MULTI_EXCLAIM_RE = re.compile(r'[!]{2,}')
+_MULTI_QUESTION_RE = re.compile(r'[?]{2,}')
+
 class InputValidator:
     """Валидация пользовательского ввода"""
-    
+
     MAX_TEXT_LENGTH = 1000
     MAX_EMOTION_LENGTH = 100
     MAX_CAUSE_LENGTH = 500
     MAX_NOTE_LENGTH = 300
-    
-    # Простая проверка на подозрительный контент
-    SUSPICIOUS_PATTERNS = [
+
+    # Простая проверка на подозрительный контент (прекомпилировано)
+    SUSPICIOUS_PATTERNS = [re.compile(p) for p in (
         r'<script',
         r'javascript:',
         r'data:text/html',
@@ -28,7 +38,7 @@ class InputValidator:
         r'onerror=',
         r'eval\(',
         r'document\.cookie',
-    ]
+    )]
     
     # Запрещенные символы
     FORBIDDEN_CHARS = ['<', '>', '{', '}', '[', ']', '\\', '|']
@@ -54,17 +64,17 @@ class InputValidator:
         # Проверка на подозрительный контент
         text_lower = text.lower()
         for pattern in cls.SUSPICIOUS_PATTERNS:
-            if re.search(pattern, text_lower):
+            if pattern.search(text_lower):
                 logger.warning(f"Suspicious content detected in {field_name}")
                 return None
-        
+
         # Удаление запрещенных символов
         for char in cls.FORBIDDEN_CHARS:
             if char in text:
                 text = text.replace(char, '')
-        
+
         # Удаление множественных пробелов
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = _WHITESPACE_RE.sub(' ', text).strip()
         
         return text if text else None
     
@@ -80,7 +90,7 @@ class InputValidator:
             return None
         
         # Эмоции не должны содержать цифры
-        if re.search(r'\d', validated):
+        if _DIGIT_RE.search(validated):
             return None
         
         return validated.lower()
@@ -112,15 +122,15 @@ class InputValidator:
             return False
         
         # Много повторяющихся символов
-        if re.search(r'(.)\1{10,}', text):
+        if _REPEATED_CHAR_RE.search(text):
             return True
-        
+
         # Много заглавных букв
         if len(text) > 10 and sum(1 for c in text if c.isupper()) / len(text) > 0.7:
             return True
-        
+
         # Слишком много эмодзи
-        emoji_count = len(re.findall(r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF\U0001F1E0-\U0001F1FF]', text))
+        emoji_count = len(_EMOJI_RE.findall(text))
         if emoji_count > 5:
             return True
         
@@ -157,15 +167,15 @@ class ContentFilter:
             return ""
         
         # Удаление множественных пробелов
-        text = re.sub(r'\s+', ' ', text)
-        
+        text = _WHITESPACE_RE.sub(' ', text)
+
         # Удаление пробелов в начале и конце
         text = text.strip()
-        
+
         # Удаление множественной пунктуации
-        text = re.sub(r'[.]{3,}', '...', text)
-        text = re.sub(r'[!]{2,}', '!', text)
-        text = re.sub(r'[?]{2,}', '?', text)
+        text = _MULTI_DOT_RE.sub('...', text)
+        text = _MULTI_EXCLAIM_RE.sub('!', text)
+        text = _MULTI_QUESTION_RE.sub('?', text)
         
         return text
 
@@ -0,0 +1,12 @@
+"""Кладёт корень репозитория в sys.path при сборе тестов.
+
+Без этого голый `pytest` не находит пакет app: корень попадает в
+sys.path только у `python -m pytest` за счёт вставки cwd.
+"""
+
+import sys
+from pathlib import Path
+
+_ROOT = str(Path(__file__).resolve().parent)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
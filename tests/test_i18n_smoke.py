@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for app.i18n
+
+Перенесены из бывшего блока `if __name__ == "__main__"` модуля i18n,
+чтобы не таскать демо-код в байткоде рабочих процессов.
+"""
+
+from app.i18n import (
+    Texts,
+    format_emotion_list,
+    format_settings_text,
+    get_period_name,
+    get_random_context_prompt,
+    get_random_emotion_prompt,
+    get_time_period_text,
+)
+
+
+def test_emotion_categories_structure():
+    assert len(Texts.EMOTION_CATEGORIES) == 9
+    for data in Texts.EMOTION_CATEGORIES.values():
+        assert data['name']
+        assert len(data['emotions']) > 0
+
+
+def test_random_prompts():
+    assert get_random_emotion_prompt()
+    assert get_random_context_prompt() in Texts.CONTEXT_PROMPTS
+
+
+def test_format_emotion_list():
+    test_emotions = [("радость", 5), ("тревога", 3), ("усталость", 2)]
+    assert format_emotion_list(test_emotions) == "радость (5), тревога (3), усталость (2)"
+    assert format_emotion_list([]) == "нет данных"
+
+
+def test_period_names():
+    assert get_period_name(7) == "неделю"
+    assert get_period_name(14) == "2 недели"
+    assert get_period_name(30) == "месяц"
+    assert get_period_name(90) == "3 месяца"
+    assert get_period_name(45) == "45 дней"
+
+
+def test_time_periods():
+    assert get_time_period_text(8) == "утром"
+    assert get_time_period_text(13) == "днём"
+    assert get_time_period_text(20) == "вечером"
+    assert get_time_period_text(2) == "ночью"
+
+
+def test_settings_formatting():
+    enabled = format_settings_text(True, 21)
+    assert enabled.startswith("⚙️")
+    assert "21:00" in enabled
+    assert Texts.SETTINGS_WEEKLY_ENABLED in enabled
+
+    disabled = format_settings_text(False, 20)
+    assert "20:00" in disabled
+    assert Texts.SETTINGS_WEEKLY_DISABLED in disabled